@@ -1,14 +1,34 @@
-from crewai import Agent
-from AI_Component.Llms import *
+from AI_Component.Llms import get_llm, LLM_PROVIDER, ANSWER_LLM_PROVIDER
+from contextlib import contextmanager
+import threading
+
+# The answer writer, shared by the crew's answer agent and the single-call fast path
+GENERAL_ANSWER_PERSONA = {
+    "role": "Science Education Instructor",
+    "goal": "Provide answers and educational materials for science education and STEM teaching questions",
+    "backstory": "You are an experienced science educator and writer who specializes in making complex scientific concepts easy to understand for students and teachers. "
+                 "You have a gift for explaining science topics in simple, engaging ways that make learning science enjoyable and accessible for everyone.",
+}
 
 class Agents :
-    def __init__(self):
-        # Define llm here llm list can be seen on Llms.py
-        self.llm = openai
+    def __init__(self, llm_provider=LLM_PROVIDER, answer_provider=ANSWER_LLM_PROVIDER):
+        # Define llm here llm list can be seen on Llms.py, the model router picks the tiers per run
+        self.llm = get_llm(llm_provider)
+        # The answer agent streams its tokens to the UI
+        self.answer_llm = get_llm(answer_provider)
         self.verbose = True
+        # Agents are built once per instance and reused by every task bound to it
+        self._built = {}
+
+    def _agent(self, name, **definition):
+        if name not in self._built:
+            # crewai is only imported when the first agent is built
+            from crewai import Agent
+            self._built[name] = Agent(**definition)
+        return self._built[name]
 
     def data_search(self):
-        return Agent(
+        return self._agent("data_search",
             role="Data Researcher and Retriever in SciMentor SEAMEO QIS",
             goal="Research and retrieve data about the given topics related to Science Education and STEM Teaching",
             backstory="You are an expert in searching information related to science education, STEM methodologies, and scientific concepts for more than 15 years. "
@@ -19,12 +39,41 @@ class Agents :
         )
     
     def general_answer(self):
-        return Agent(
-            role="Science Education Instructor",
-            goal="Provide answers and educational materials for science education and STEM teaching questions",
-            backstory="You are an experienced science educator and writer who specializes in making complex scientific concepts easy to understand for students and teachers. "
-                      "You have a gift for explaining science topics in simple, engaging ways that make learning science enjoyable and accessible for everyone.",
+        return self._agent("general_answer",
+            **GENERAL_ANSWER_PERSONA,
             allow_delegation=False,
-            llm=self.llm,
+            llm=self.answer_llm,
             verbose=self.verbose
         )
+
+class AgentPool:
+    """Process-wide pool of prebuilt agent sets
+
+    A crewai Agent keeps per-run state while it executes, so each running crew
+    leases its own set; sets are built on demand and reused afterwards. Sets
+    are kept apart per model tier combination, passed as the factory arguments.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.created = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self, *providers):
+        with self._lock:
+            idle = self._idle.setdefault(providers, [])
+            agents = idle.pop() if idle else None
+            if agents is None:
+                self.created += 1
+        if agents is None:
+            agents = self.factory(*providers)
+        try:
+            yield agents
+        finally:
+            with self._lock:
+                self._idle[providers].append(agents)
+
+# Initialize global agent pool instance
+agent_pool = AgentPool(Agents)
@@ -0,0 +1,130 @@
+from AI_Component.Text import tokenize, estimate_tokens
+from AI_Component.Tracing import span
+from AI_Component.Events import emit
+from collections import Counter
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import math
+import re
+import os
+
+# Search results are compacted before they reach an agent prompt
+COMPACTION = os.getenv("QIS_COMPACTION", "1") == "1"
+# Token budget of the compacted results, source links included
+COMPACTION_TOKENS = int(os.getenv("QIS_COMPACTION_TOKENS", "1200"))
+# Passages are whole sentences grouped up to this many words
+PASSAGE_WORDS = int(os.getenv("QIS_PASSAGE_WORDS", "60"))
+
+_sentence_end = re.compile(r"(?<=[.!?])\s+|\n+")
+_tracking_parameters = ("utm_", "fbclid", "gclid", "mc_")
+
+def canonical_url(url):
+    """Same page, same key: no fragment, tracking parameters, "www." or trailing slash"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query) if not key.lower().startswith(_tracking_parameters)])
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip("/"), query, ""))
+
+def split_passages(text, max_words=PASSAGE_WORDS, seen=None):
+    """Group sentences into passages of at most max_words words (a longer sentence stays whole)
+
+    Sentences already in `seen` (normalized) are skipped, so text repeated
+    within or across results is only kept once.
+    """
+    seen = set() if seen is None else seen
+    passages, current, words = [], [], 0
+    for sentence in _sentence_end.split(text or ""):
+        sentence = sentence.strip()
+        fingerprint = " ".join(tokenize(sentence))
+        if not fingerprint or fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        length = len(sentence.split())
+        if current and words + length > max_words:
+            passages.append(" ".join(current))
+            current, words = [], 0
+        current.append(sentence)
+        words += length
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+class BM25:
+    """Okapi BM25 over a small in-memory set of tokenized passages"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.frequencies = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = sum(self.lengths) / len(documents) if documents else 0
+        document_frequency = Counter(term for frequencies in self.frequencies for term in frequencies)
+        count = len(documents)
+        self.idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def scores(self, query):
+        terms = [term for term in set(query) if term in self.idf]
+        scores = []
+        for frequencies, length in zip(self.frequencies, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            scores.append(sum(self.idf[term] * frequencies[term] * (self.k1 + 1) / (frequencies[term] + norm)
+                              for term in terms if term in frequencies))
+        return scores
+
+def compact_results(question, results, budget=COMPACTION_TOKENS, max_words=PASSAGE_WORDS):
+    """Deduplicate, rank and trim search results to a token budget
+
+    Duplicate URLs and sentences are dropped, the remaining passages are ranked
+    against the question with BM25 and the best ones kept until the budget is
+    spent. Every distinct source URL is kept, with an empty content when none
+    of its passages made the cut, so the answer can still cite it.
+    Returns (results, report) in the {url, content} shape of the search tool.
+    """
+    sources, passages, seen_sentences = {}, [], set()
+    for result in results:
+        url = result.get("url", "")
+        key = canonical_url(url)
+        if key not in sources:
+            sources[key] = url
+        for passage in split_passages(result.get("content", ""), max_words, seen_sentences):
+            passages.append((key, passage, tokenize(passage)))
+
+    scores = BM25([tokens for _, _, tokens in passages]).scores(tokenize(question)) if passages else []
+    # Links are always kept, the rest of the budget goes to passages by score
+    used = sum(estimate_tokens(f"{{'url': '{url}', 'content': ''}}, ") for url in sources.values())
+    kept = set()
+    relevant = any(score > 0 for score in scores)
+    for index in sorted(range(len(passages)), key=lambda index: (-scores[index], index)):
+        cost = estimate_tokens(passages[index][1]) + 1
+        # Passages sharing no term with the question only fill the prompt
+        if kept and (used + cost > budget or (relevant and scores[index] <= 0)):
+            continue
+        kept.add(index)
+        used += cost
+
+    best = {key: -1.0 for key in sources}
+    contents = {key: [] for key in sources}
+    for index, (key, passage, _) in enumerate(passages):
+        if index in kept:
+            contents[key].append(passage)
+            best[key] = max(best[key], scores[index])
+    order = sorted(sources, key=lambda key: -best[key])
+    compacted = [{"url": sources[key], "content": " ".join(contents[key])} for key in order]
+
+    tokens_before = estimate_tokens(str(results))
+    tokens_after = estimate_tokens(str(compacted))
+    report = {"results_before": len(results), "results_after": len(compacted), "passages": len(passages),
+              "passages_kept": len(kept), "tokens_before": tokens_before, "tokens_after": tokens_after,
+              "tokens_saved": max(0, tokens_before - tokens_after)}
+    return compacted, report
+
+def compact(question, results, budget=COMPACTION_TOKENS):
+    """compact_results as a traced pipeline stage; returns the results unchanged when disabled"""
+    if not COMPACTION or not results:
+        return results
+    with span("compaction") as current:
+        compacted, report = compact_results(question, results, budget)
+        current.set(**report)
+    emit("compacted", **report)
+    return compacted
@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class RequestContext:
+    """Per-question state, so concurrent sessions never share verdicts or flags"""
+    question: str
+    lang: str = "english"
+    verdict: Optional[str] = None
+    # Set when the question is about SEAMEO QIS itself; drives inject_context
+    is_seaqis_context: bool = False
+    # Set when the rules (not the model) decided the verdict
+    fallback_active: bool = False
+    matched_rule: Optional[str] = None
+    # Set by the async entry points: the answer was cut at the deadline, and how the budget was used
+    partial: bool = False
+    budget_report: Optional[dict] = None
+    # Rolling summary of the earlier turns when the question follows up on them
+    conversation: str = ""
+    # Verdict of the turn the question follows up on
+    follows: Optional[str] = None
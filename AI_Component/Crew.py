@@ -1,21 +1,57 @@
-from crewai import Crew, Process
-from AI_Component.Agents import *
-from AI_Component.Tasks import *
-from AI_Component.Llms import *
+from AI_Component.Agents import Agents, agent_pool
+from AI_Component.Tasks import Tasks
+from AI_Component.Llms import get_llm
+from AI_Component.Events import emit
+from AI_Component.Router import model_router
+from AI_Component.Tracing import lap
+from AI_Component.Deadline import Budget, answer_within
+from AI_Component.Context import RequestContext
+
+def emit_task_finished(output):
+    """Crew task callback that reports each finished task as a pipeline event and a span"""
+    agent = str(getattr(output, "agent", ""))
+    lap("crew_task", agent=agent)
+    emit("task_finished", agent=agent)
 
 class QisCrew:
-    def __init__(self, input, lang):
+    def __init__(self, input, lang, prefetched=None, agents=None):
         self.input = input
         self.lang = lang
-        self.tasks = Tasks(self.input,self.lang)
-        self.agents = Agents()
+        self.prefetched = prefetched
+        self.agents = agents or Agents()
+        self.tasks = Tasks(self.input,self.lang,prefetched,self.agents)
 
     def generalCrew(self):
+        from crewai import Crew, Process
         task = self.tasks
         agent = self.agents
         return Crew(
             tasks=[task.general_search_task(),task.general_answer_task()],
             agents=[agent.data_search(),agent.general_answer()],
             process=Process.sequential,
-            manager_llm=openai
+            manager_llm=get_llm("openai"),
+            task_callback=emit_task_finished
     )
+
+    def kickoff(self):
+        """Run the general crew on a prebuilt agent set leased from the pool
+
+        The model router picks the search and answer tiers and retries the crew
+        on the next tiers when a model times out or fails.
+        """
+        def attempt(search_tier, answer_tier):
+            with agent_pool.lease(search_tier, answer_tier) as agents:
+                return QisCrew(self.input, self.lang, self.prefetched, agents).generalCrew().kickoff()
+
+        return model_router.run_crew(self.input, attempt)
+
+    async def akickoff(self, budget=None, context=None, late=None):
+        """kickoff within the answer slice of a latency budget
+
+        Returns the answer, or the part written before the deadline with a
+        notice (context.partial is set); late receives the complete answer.
+        """
+        budget = budget or Budget()
+        context = context or RequestContext(self.input, self.lang)
+        with budget.applied():
+            return await answer_within(budget, context, self.kickoff, self.prefetched, late, self.lang)
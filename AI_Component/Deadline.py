@@ -0,0 +1,218 @@
+"""End-to-end latency budgets for the async pipeline entry points
+
+A Budget splits one total (QIS_LATENCY_BUDGET seconds) across the
+classification, search and answer stages. Each stage may run until its
+cumulative share of the total has passed, so time an earlier stage left
+unused rolls over to the next one. A stage that overruns does not fail the
+request: search continues with the results that arrived, and the answer
+returns the text written so far with a notice. Classification is the gate,
+so a question the model could not judge in time is rejected rather than
+answered. The per-stage use ends up in RequestContext.budget_report.
+
+Rules and the local classifier decide inline; only the model calls
+(classification, translation) share the stage pool. Crews run in a pool of
+their own, so crews that overran and still finish in the background can
+never hold up the classification of later requests. Work that has not
+started by its deadline is cancelled.
+
+    budget = Budget(20)
+    answer = await QisAgentChain(question, lang).aprocess_question(budget, context=context)
+"""
+from AI_Component.Events import listen, FinalAnswerFilter
+from AI_Component.Speculation import SpeculativeSearch, SPECULATIVE_SEARCH
+from AI_Component.Tasks import format_search_results
+from AI_Component.Translation import translate, cached_translation, untranslated
+from AI_Component.validator.rules import REJECT
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import time
+import os
+
+# Total seconds per request; 0 means no deadline (stage use is still reported)
+LATENCY_BUDGET = float(os.getenv("QIS_LATENCY_BUDGET", "0"))
+
+# Share of the total each stage may use, in pipeline order
+STAGE_SHARES = {"classification": 0.1, "search": 0.25, "answer": 0.65}
+
+PARTIAL_NOTICE = {
+    "english": "*This answer was cut short so it could reach you in time. Ask again for the complete answer.*",
+    "indonesian": "*Jawaban ini dipotong agar dapat segera ditampilkan. Tanyakan lagi untuk jawaban lengkapnya.*",
+}
+SOURCES_ONLY = {
+    "english": "The answer could not be written in time. These sources cover the question:",
+    "indonesian": "Jawaban belum sempat ditulis. Sumber berikut membahas pertanyaan ini:",
+}
+
+# Blocking stages run here rather than in the event loop's executor: a stage
+# that overran keeps its thread, and closing the loop must not wait for it.
+# Model calls of the short stages, and the crews (bounded on their own)
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("QIS_DEADLINE_WORKERS", "8")), thread_name_prefix="qis-deadline")
+_answer_pool = ThreadPoolExecutor(max_workers=int(os.getenv("QIS_DEADLINE_ANSWER_WORKERS", "8")),
+                                  thread_name_prefix="qis-deadline-answer")
+
+_budget = contextvars.ContextVar("qis_latency_budget", default=None)
+
+def current_budget():
+    """The budget of the request running in this context, or None"""
+    return _budget.get()
+
+class Budget:
+    """Deadline of one request and how its stages used it"""
+
+    def __init__(self, total=LATENCY_BUDGET, shares=STAGE_SHARES):
+        self.total = total
+        self.shares = shares
+        self.started = time.monotonic()
+        self.stages = {}
+
+    def deadline(self, stage=None):
+        """Monotonic time the stage (or, without one, the request) has to finish by"""
+        if stage is None:
+            return self.started + self.total
+        share = 0.0
+        for name, part in self.shares.items():
+            share += part
+            if name == stage:
+                break
+        return self.started + self.total * share
+
+    def remaining(self, stage=None):
+        """Seconds left for the stage (or the request), None without a deadline"""
+        if not self.total:
+            return None
+        return max(0.0, self.deadline(stage) - time.monotonic())
+
+    @contextmanager
+    def stage(self, name):
+        """Record the stage's slice and use; the block marks an overrun with record["overran"] = True"""
+        # The answer is the last stage, it may use whatever is left of the total
+        allowed = self.remaining(None if name == list(self.shares)[-1] else name)
+        record = {"budget": None if allowed is None else round(allowed, 3), "overran": False}
+        self.stages[name] = record
+        start = time.monotonic()
+        try:
+            yield record
+        finally:
+            record["used"] = round(time.monotonic() - start, 3)
+
+    @contextmanager
+    def applied(self):
+        """Make this the current budget, so the search tool sees the deadline too"""
+        token = _budget.set(self)
+        try:
+            yield self
+        finally:
+            _budget.reset(token)
+
+    def report(self):
+        used = time.monotonic() - self.started
+        return {"total": self.total, "used": round(used, 3), "overran": bool(self.total) and used > self.total,
+                "stages": dict(self.stages)}
+
+def run_in_thread(function, *args, pool=None):
+    """Start function in the stage pool (or pool), in a copy of this context; returns the concurrent Future"""
+    return (pool or _pool).submit(contextvars.copy_context().run, function, *args)
+
+async def wait_within(future, timeout):
+    """Wait for a concurrent Future up to timeout seconds (None: no limit) without cancelling it"""
+    return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+
+async def wait_or_cancel(future, timeout):
+    """wait_within, cancelling the work on a timeout if it has not started yet"""
+    try:
+        return await wait_within(future, timeout)
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise
+
+def partial_answer(text, lang, sources=None):
+    """The text written before the deadline with a notice, or the sources when there is none"""
+    key = "indonesian" if lang.lower().startswith(("indo", "bahasa")) else "english"
+    if text.strip():
+        return f"{text.rstrip()}\n\n---\n{PARTIAL_NOTICE[key]}"
+    if sources:
+        return f"{SOURCES_ONLY[key]}\n{format_search_results(sources, max_chars=200)}\n\n---\n{PARTIAL_NOTICE[key]}"
+    return PARTIAL_NOTICE[key]
+
+async def classify_within(budget, question, classify, speculative=SPECULATIVE_SEARCH, query=None):
+    """Async classify_speculatively bounded by the classification slice
+
+    classify(question, use_llm) returns None when use_llm is False and the
+    rules and the local classifier cannot decide; those run inline, and only
+    the model call is bounded by the slice. A model that does not answer in
+    time rejects the question: an unjudged question must not pass the gate.
+    As in classify_speculatively, the search only starts once the inline
+    checks have not rejected the question.
+    """
+    speculation = None
+    with budget.stage("classification") as stage:
+        verdict = classify(question, False)
+        if verdict != REJECT and speculative:
+            speculation = SpeculativeSearch(query or question)
+        if verdict is None:
+            try:
+                verdict = await wait_or_cancel(run_in_thread(classify, question, True), stage["budget"])
+            except asyncio.TimeoutError:
+                stage["overran"] = True
+                verdict = REJECT
+    if verdict == REJECT and speculation is not None:
+        speculation.discard()
+        speculation = None
+    return verdict, speculation
+
+async def search_within(budget, speculation):
+    """Results of the speculative search, or [] when they did not arrive within the search slice"""
+    with budget.stage("search") as stage:
+        if speculation is None:
+            return None
+        try:
+            return await wait_within(speculation.future, stage["budget"])
+        except asyncio.TimeoutError:
+            stage["overran"] = True
+            speculation.discard()
+            return []
+        except Exception:
+            # A failed search leaves the research to the agent, as in the synchronous path
+            return None
+
+async def answer_within(budget, context, run, sources=None, late=None, lang=None):
+    """Run the blocking crew run() within the answer slice
+
+    Returns the answer, or on an overrun the streamed text so far with a
+    notice (context.partial is set). A crew that had not started is
+    cancelled; a running one keeps its thread in the answer pool and
+    late(answer) receives its complete answer if given, e.g. for the cache.
+    lang is the language the crew writes in (default context.lang).
+    """
+    tokens = FinalAnswerFilter()
+    written = []
+
+    def collect(kind, data):
+        if kind == "token":
+            written.append(tokens.feed(data["text"]))
+
+    with budget.stage("answer") as stage, listen(collect):
+        # The worker thread runs in a copy of this context, listener and budget included
+        future = run_in_thread(run, pool=_answer_pool)
+        try:
+            return str(await wait_or_cancel(future, stage["budget"]))
+        except asyncio.TimeoutError:
+            stage["overran"] = True
+    context.partial = True
+    if late is not None and not future.cancelled():
+        future.add_done_callback(lambda done: done.exception() or late(str(done.result())))
+    return partial_answer("".join(written), lang or context.lang, sources)
+
+async def translate_within(budget, answer, lang):
+    """translate bounded by what is left of the budget; on an overrun the canonical answer with a notice"""
+    with budget.stage("translation") as stage:
+        translated = cached_translation(answer, lang)
+        if translated is not None:
+            return translated
+        try:
+            return await wait_or_cancel(run_in_thread(translate, answer, lang), stage["budget"])
+        except asyncio.TimeoutError:
+            stage["overran"] = True
+    return untranslated(answer, lang)
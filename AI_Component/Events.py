@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+import contextvars
+import threading
+
+# Listeners of the current request; a context variable keeps concurrent sessions apart
+_listeners = contextvars.ContextVar("qis_event_listeners", default=())
+
+def emit(kind, **data):
+    """Send a pipeline event (stage change, token, ...) to the current request's listeners"""
+    for listener in _listeners.get():
+        listener(kind, data)
+
+@contextmanager
+def listen(callback):
+    """Receive every event emitted in this context while the block runs"""
+    token = _listeners.set(_listeners.get() + (callback,))
+    try:
+        yield
+    finally:
+        _listeners.reset(token)
+
+def forwarder():
+    """Capture the current request's listeners so events from another thread reach them"""
+    listeners = _listeners.get()
+
+    def forward(kind, data):
+        for listener in listeners:
+            listener(kind, data)
+
+    return forward
+
+_stream_forwarded = False
+_stream_lock = threading.Lock()
+
+def forward_crewai_stream():
+    """Forward crewai's streamed LLM chunks as "token" events, registered once per process
+
+    Every streaming model tier calls this when it is built; a second handler
+    on the event bus would emit each chunk twice.
+    """
+    global _stream_forwarded
+    try:
+        from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+    except ImportError:
+        return False
+
+    with _stream_lock:
+        if not _stream_forwarded:
+            @crewai_event_bus.on(LLMStreamChunkEvent)
+            def on_chunk(source, event):
+                emit("token", text=event.chunk)
+
+            _stream_forwarded = True
+    return True
+
+class FinalAnswerFilter:
+    """Drop the ReAct "Thought: ..." preamble so only the final answer is streamed"""
+    marker = "Final Answer:"
+
+    def __init__(self):
+        self.buffer = ""
+        self.passing = False
+
+    def feed(self, text):
+        if self.passing:
+            return text
+        self.buffer += text
+        if self.marker in self.buffer:
+            self.passing = True
+            return self.buffer.split(self.marker, 1)[1].lstrip()
+        if not self.buffer.lstrip().startswith("Thought"[:len(self.buffer.lstrip())]):
+            # The agent answered without the ReAct preamble
+            self.passing = True
+            return self.buffer
+        return ""
@@ -0,0 +1,87 @@
+"""Fast execution mode: search the question directly, then make a single answer call
+
+In crew mode every answer goes through two sequential crewai agents, and the
+research agent spends several ReAct round-trips deciding to call the search
+tool. In fast mode the pipeline searches the question itself and sends one
+prompt, with the answer agent's persona and the general answer task, to the
+"answer" route of the model router: one LLM call per question.
+
+The mode is chosen per request (mode="fast" on answer_question, "mode" in the
+API body, --mode in batch.py); QIS_EXECUTION_MODE sets the default.
+
+    QIS_EXECUTION_MODE=crew|fast   (crew)
+"""
+from AI_Component.Agents import GENERAL_ANSWER_PERSONA
+from AI_Component.Tasks import format_search_results, general_answer_description, answer_expected_output
+from AI_Component.ToolsLib.TavilySearch.client import search
+from AI_Component.Compaction import compact
+from AI_Component.Router import model_router
+from AI_Component.Events import emit
+from AI_Component.Tracing import span
+import os
+
+CREW = "crew"
+FAST = "fast"
+EXECUTION_MODES = (CREW, FAST)
+EXECUTION_MODE = os.getenv("QIS_EXECUTION_MODE", CREW)
+
+# The crew answer agent's prompt, flattened into one message
+FAST_ANSWER_TEMPLATE = (
+    "You are {role}. {backstory}\n"
+    "Your personal goal is: {goal}\n\n"
+    "{description}\n\n"
+    "Search results:\n{results}\n\n"
+    "This is the expected criteria for your answer: {expected_output}\n"
+    "Reply with the answer only."
+)
+
+def execution_mode(mode=None):
+    """Validated execution mode, the configured default when mode is None"""
+    mode = (mode or EXECUTION_MODE).strip().lower()
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"unknown execution mode '{mode}', expected one of {', '.join(EXECUTION_MODES)}")
+    return mode
+
+def cache_path(verdict, mode):
+    """Answer cache path of a verdict; fast answers are cached apart from the crew's"""
+    return verdict if mode == CREW else f"{verdict}:{mode}"
+
+def search_directly(question, current):
+    """Search the question without an agent; a failed search leaves the answer without results
+
+    The failure is counted by the "search" span and noted on current, the
+    fast path's span.
+    """
+    emit("search_started", query=question)
+    try:
+        results = search(question)
+    except Exception as error:
+        current.set(search_error=f"{type(error).__name__}: {error}")
+        results = []
+    emit("search_finished", query=question, results=len(results))
+    return results
+
+def fast_answer_prompt(input, lang, results):
+    return FAST_ANSWER_TEMPLATE.format(**GENERAL_ANSWER_PERSONA,
+                                       description=general_answer_description(input),
+                                       results=format_search_results(results) or "(none)",
+                                       expected_output=answer_expected_output(lang))
+
+def fast_answer(input, lang, prefetched=None, question=None, router=model_router):
+    """Answer with one model call on the search results for the question
+
+    input is the text the answer task reads (it may carry the conversation or
+    the SEAQIS instruction); question, the raw question by default, is what
+    is searched and what picks the answer tier. prefetched results (from the
+    speculative search, a session or the knowledge base) replace the search.
+    """
+    question = question or input
+    with span("fast_path") as current:
+        results = search_directly(question, current) if prefetched is None else prefetched
+        # Only deduplicated, relevant passages within the token budget reach the prompt
+        results = compact(question, results)
+        emit("evidence", results=results)
+        emit("writing_started")
+        answer, tier = router.invoke("answer", fast_answer_prompt(input, lang, results), question=question)
+        current.set(model=tier, results=len(results))
+    return answer
@@ -0,0 +1,130 @@
+"""httpx clients whose every request goes through the shared rate limiter
+
+    ChatOpenAI(..., http_client=http_client("openai"), http_async_client=async_http_client("openai"))
+
+A request first waits for its provider's capacity (interactive before batch),
+then goes out; x-ratelimit-* headers update the limiter, and a 429 or 5xx is
+retried after a jittered backoff (or the provider's Retry-After), up to
+QIS_RATE_RETRIES times, before the response is handed back to the client.
+"""
+from AI_Component.RateLimit import rate_limiter, backoff, parse_reset
+from AI_Component.Text import estimate_tokens
+import asyncio
+import httpx
+import json
+import time
+import os
+
+RETRIES = int(os.getenv("QIS_RATE_RETRIES", "3"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Completion tokens assumed when a request does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = int(os.getenv("QIS_RATE_COMPLETION_TOKENS", "512"))
+
+def estimate_request_tokens(request):
+    """Prompt plus expected completion tokens of an OpenAI-style JSON request"""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return 0
+    if not isinstance(body, dict):
+        return 0
+    prompt = body.get("messages") or body.get("prompt") or body.get("query") or ""
+    if "model" not in body:
+        # Not an LLM call (a search), only the request bucket applies
+        return 0
+    return estimate_tokens(json.dumps(prompt, ensure_ascii=False)) + int(body.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying this response"""
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        seconds = parse_reset(response.headers.get(name))
+        if seconds is not None:
+            # Jitter keeps the callers released by the same reset from arriving together
+            return seconds + backoff(0)
+    return backoff(attempt)
+
+def usage_tokens(response):
+    """Total tokens a non-streamed JSON response reports, if any"""
+    if "json" not in response.headers.get("content-type", ""):
+        return None
+    try:
+        return response.json().get("usage", {}).get("total_tokens")
+    except (ValueError, AttributeError):
+        return None
+
+class RateLimitedTransport(httpx.HTTPTransport):
+    def __init__(self, provider, retries=RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = rate_limiter.provider(provider)
+        self.retries = retries
+
+    def handle_request(self, request):
+        tokens = estimate_request_tokens(request)
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                response = super().handle_request(request)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+                time.sleep(backoff(attempt))
+                continue
+            self.limiter.observe_headers(response.headers)
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            delay = retry_delay(response, attempt)
+            if response.status_code == 429:
+                self.limiter.pause(delay)
+            response.close()
+            time.sleep(delay)
+
+class AsyncRateLimitedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, provider, retries=RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = rate_limiter.provider(provider)
+        self.retries = retries
+
+    async def handle_async_request(self, request):
+        tokens = estimate_request_tokens(request)
+        for attempt in range(self.retries + 1):
+            # Waits on the event loop, a throttled request holds no thread
+            await self.limiter.aacquire(tokens)
+            try:
+                response = await super().handle_async_request(request)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(backoff(attempt))
+                continue
+            self.limiter.observe_headers(response.headers)
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            delay = retry_delay(response, attempt)
+            if response.status_code == 429:
+                self.limiter.pause(delay)
+            await response.aclose()
+            await asyncio.sleep(delay)
+
+class UsageSettlingClient(httpx.Client):
+    """Charges the limiter the real token usage once a JSON response is read"""
+
+    def __init__(self, provider, **kwargs):
+        self.limiter = rate_limiter.provider(provider)
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        estimated = estimate_request_tokens(request)
+        response = super().send(request, **kwargs)
+        if not kwargs.get("stream") and estimated:
+            self.limiter.settle(estimated, usage_tokens(response))
+        return response
+
+def http_client(provider, timeout=60, pool_size=10):
+    """Shared-limit sync client for the given provider"""
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    return UsageSettlingClient(provider, transport=RateLimitedTransport(provider, limits=limits), timeout=timeout)
+
+def async_http_client(provider, timeout=60, pool_size=10):
+    """Shared-limit async client for the given provider"""
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    return httpx.AsyncClient(transport=AsyncRateLimitedTransport(provider, limits=limits), timeout=timeout)
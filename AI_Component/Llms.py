@@ -1,39 +1,175 @@
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from AI_Component.Events import forward_crewai_stream
+import threading
 import os
 
 # Load ENV and API's
 load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("API Key tidak ditemukan. Pastikan file .env memiliki OPENAI_API_KEY yang valid.")
 
-groqapi_key = os.getenv('groqapi_key')
-if not groqapi_key:
-    raise ValueError("Groq API key tidak ditemukan")
+# Providers used by the agents, selected by config
+LLM_PROVIDER = os.getenv("QIS_LLM_PROVIDER", "openai")
+ANSWER_LLM_PROVIDER = os.getenv("QIS_ANSWER_LLM_PROVIDER", "openai_stream")
+# Groq's OpenAI-compatible endpoint takes the bare model id, without litellm's "groq/" prefix
+GROQ_MODEL = os.getenv("QIS_GROQ_MODEL", "llama-3.1-8b-instant")
+LLM_TIMEOUT = float(os.getenv("QIS_LLM_TIMEOUT", "60"))
 
-# LLMS 
+__all__ = ["registry", "get_llm", "LLM_PROVIDER", "ANSWER_LLM_PROVIDER", "LLM_TIMEOUT"]
+
+class LlmRegistry:
+    """Named LLM clients that are only built the first time they are used
+
+    A provider registered with a fallback resolves to the fallback's client
+    when its builder raises ImportError (an optional dependency is missing).
+    """
+
+    def __init__(self):
+        self._builders = {}
+        self._fallbacks = {}
+        self._instances = {}
+        # One lock per name, so a slow build never holds up the other providers
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, builder, fallback=None):
+        self._builders[name] = builder
+        if fallback is not None:
+            self._fallbacks[name] = fallback
+        return builder
+
+    def get(self, name):
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self._builders:
+            raise KeyError(f"LLM provider '{name}' tidak terdaftar, pilihan: {', '.join(self._builders)}")
+        with self._lock:
+            lock = self._building.setdefault(name, threading.Lock())
+        with lock:
+            if name in self._instances:
+                return self._instances[name]
+            try:
+                self._instances[name] = self._builders[name]()
+                print(f"{name} instance succesfully created!")
+                return self._instances[name]
+            except ImportError:
+                if name not in self._fallbacks:
+                    raise
+        # Resolved outside this name's lock, the fallback is built under its own
+        return self._instances.setdefault(name, self.get(self._fallbacks[name]))
+
+    def built(self):
+        return list(self._instances)
+
+    def __contains__(self, name):
+        return name in self._builders
+
+registry = LlmRegistry()
+
+def get_llm(name=LLM_PROVIDER):
+    """Return the client of the given provider, building it on first use"""
+    return registry.get(name)
+
+# Every client shares the process-wide rate limiter, httpx is imported on first build
+def _http_client(provider):
+    from AI_Component.HttpClients import http_client
+    return http_client(provider, timeout=LLM_TIMEOUT)
+
+def _async_http_client(provider):
+    from AI_Component.HttpClients import async_http_client
+    return async_http_client(provider, timeout=LLM_TIMEOUT)
+
+def _openai_api_key():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("API Key tidak ditemukan. Pastikan file .env memiliki OPENAI_API_KEY yang valid.")
+    return api_key
+
+# LLMS
 
 ##ollama
-ollama = ChatOpenAI(
-    model= "ollama/crewai-llama3.2",
-    base_url = "http://localhost:11434/v1"
-)
-
-##OpenAI 
-openai = ChatOpenAI(
-    model='gpt-4o',
-    temperature=0.3,
-    api_key = api_key
-)
+def _build_ollama():
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model= "ollama/crewai-llama3.2",
+        base_url = "http://localhost:11434/v1"
+    )
+
+##OpenAI
+def _chat_openai(model, temperature=0.3):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        api_key = _openai_api_key(),
+        # Fail fast so the model router can fall back to the next tier
+        timeout=LLM_TIMEOUT,
+        # Retries happen in the rate-limited transport, after the provider's backoff
+        max_retries=0,
+        http_client=_http_client("openai"),
+        http_async_client=_async_http_client("openai")
+    )
+
+##OpenAI streaming, used by the answer agent so the UI receives tokens as they are generated
+def _stream_openai(model):
+    # Without crewai this raises ImportError and the registry uses the provider's fallback
+    from crewai import LLM
+    forward_crewai_stream()
+    try:
+        import litellm
+        # litellm sends the streamed completions, through the same limiter as ChatOpenAI
+        if litellm.client_session is None:
+            litellm.client_session = _http_client("openai")
+            litellm.aclient_session = _async_http_client("openai")
+    except ImportError:
+        pass
+    return LLM(
+        model=model,
+        temperature=0.3,
+        api_key = _openai_api_key(),
+        base_url=os.getenv("OPENAI_BASE_URL"),
+        timeout=LLM_TIMEOUT,
+        stream=True
+    )
+
+def _build_openai():
+    return _chat_openai('gpt-4o')
+
+def _build_openai_stream():
+    return _stream_openai('gpt-4o')
+
+##OpenAI small tier for validation, search synthesis and easy answers
+def _build_openai_mini():
+    return _chat_openai('gpt-4o-mini')
+
+def _build_openai_mini_stream():
+    return _stream_openai('gpt-4o-mini')
 
 ##Groq
-os.environ["GROQ_API_KEY"] = groqapi_key
-groq = ChatOpenAI(
-    openai_api_base="https://api.groq.com/openai/v1",
-    openai_api_key=os.environ['GROQ_API_KEY'],
-    model_name="groq/llama-3.2-3b-preview",
-    temperature=0,
-)
-
-print("instance succesfully created!")
+def _build_groq():
+    from langchain_openai import ChatOpenAI
+    groqapi_key = os.getenv('groqapi_key')
+    if not groqapi_key:
+        raise ValueError("Groq API key tidak ditemukan")
+    os.environ["GROQ_API_KEY"] = groqapi_key
+    return ChatOpenAI(
+        openai_api_base=os.getenv("QIS_GROQ_BASE_URL", "https://api.groq.com/openai/v1"),
+        openai_api_key=os.environ['GROQ_API_KEY'],
+        model_name=GROQ_MODEL,
+        temperature=0,
+        timeout=LLM_TIMEOUT,
+        max_retries=0,
+        http_client=_http_client("groq"),
+        http_async_client=_async_http_client("groq"),
+    )
+
+registry.register("ollama", _build_ollama)
+registry.register("openai", _build_openai)
+registry.register("openai_stream", _build_openai_stream, fallback="openai")
+registry.register("openai_mini", _build_openai_mini)
+registry.register("openai_mini_stream", _build_openai_mini_stream, fallback="openai_mini")
+registry.register("groq", _build_groq)
+
+def __getattr__(name):
+    # Keeps `from AI_Component.Llms import openai` working, built on first access
+    if name in registry:
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
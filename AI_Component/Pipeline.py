@@ -0,0 +1,310 @@
+from AI_Component.Crew import QisCrew
+from AI_Component.qis_agent_chain import QisAgentChain, with_conversation
+from AI_Component.validator.validator import classify_question, SCIENCE, SEAQIS, REJECT
+from AI_Component.Speculation import classify_speculatively, SPECULATIVE_SEARCH
+from AI_Component.cache.answer_cache import answer_cache
+from AI_Component.Events import emit, listen, forwarder, FinalAnswerFilter
+from AI_Component.Context import RequestContext
+from AI_Component.SingleFlight import SingleFlight
+from AI_Component.Text import normalize_question
+from AI_Component.Tracing import span
+from AI_Component.Deadline import Budget, classify_within, search_within, answer_within, translate_within, LATENCY_BUDGET
+from AI_Component.Session import EvidenceSearch
+from AI_Component.Translation import translate, is_canonical, TRANSLATION, CANONICAL_LANGUAGE
+from AI_Component.FastPath import fast_answer, execution_mode, cache_path, CREW, FAST
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import queue
+import os
+
+# Bounded pool that runs the pipeline for all sessions of this replica
+MAX_WORKERS = int(os.getenv("QIS_MAX_WORKERS", "8"))
+pipeline_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="qis-pipeline")
+
+# Identical questions asked at the same time share one pipeline run
+pipeline_flight = SingleFlight()
+
+def run_pipeline(question, lang, verdict, prefetched=None, context=None, speculation=None, mode=CREW):
+    """Run the crew that matches the verdict and return the answer text
+
+    speculation is the web search started during classification; its results
+    are only waited for by a path that searches the web. mode="fast" replaces
+    the crew with a single answer call (see AI_Component.FastPath).
+    """
+    if verdict == SEAQIS:
+        # Use the specialized SEAQIS agent chain, which may answer from local documents
+        result = QisAgentChain(question, lang).process_question(verdict=verdict, prefetched=prefetched,
+                                                                context=context, speculation=speculation, mode=mode)
+    else:
+        if prefetched is None and speculation is not None:
+            prefetched = speculation.results()
+        if mode == FAST:
+            result = fast_answer(with_conversation(question, context), lang, prefetched, question)
+        else:
+            # Use the general science education agent chain
+            result = QisCrew(with_conversation(question, context), lang, prefetched).kickoff()
+    return str(result)
+
+def pipeline_language(lang):
+    """Language the crews write in: the canonical one when answers are translated afterwards"""
+    return CANONICAL_LANGUAGE if TRANSLATION else lang
+
+def open_turn(session, question, context):
+    """Return (search query, reused evidence, covered) for a turn of a conversation
+
+    Without a session the question stands alone. A follow-up gets the
+    conversation and the verdict it continues in the context. See
+    AI_Component.Session.
+    """
+    if session is None:
+        return question, [], False
+    previous = session.follows(question)
+    if previous is not None:
+        context.conversation = session.conversation()
+        context.follows = previous.verdict
+    reused, covered = session.relevant_evidence(question)
+    return session.search_query(question), reused, covered
+
+def classify_turn(question, context, use_llm=True):
+    """classify_question, where a follow-up rejected on its own words continues the accepted turn it follows"""
+    verdict = classify_question(question, context, use_llm)
+    if verdict == REJECT and context.follows not in (None, REJECT):
+        return context.follows
+    return verdict
+
+def answer_question(question, lang, verdict=None, use_cache=True, speculative=None, context=None, session=None,
+                    mode=None):
+    """Classify the question and answer it from the cache or the matching pipeline
+
+    Without a verdict the web search for the question starts while it is being
+    classified (speculative, on by default through QIS_SPECULATIVE_SEARCH); a
+    rejected question discards it. Returns None when the question is rejected.
+    With a ConversationSession the question reuses the evidence of its earlier
+    turns, is answered with the conversation when it looks like a follow-up,
+    and is recorded as a new turn.
+    The crews answer in the canonical language (cached once for all
+    languages), which is then translated to lang (see AI_Component.Translation).
+    mode is "crew" or "fast" (one answer call, see AI_Component.FastPath),
+    QIS_EXECUTION_MODE when None; each mode has its own cached answers.
+    """
+    mode = execution_mode(mode)
+    if context is None:
+        context = RequestContext(question, lang)
+    saved, evidence = [], []
+
+    def observe(kind, data):
+        if kind == "compacted":
+            saved.append(data["tokens_saved"])
+        elif kind == "evidence":
+            evidence.extend(data["results"])
+
+    query, reused, covered = open_turn(session, question, context)
+    with span("request", lang=lang, mode=mode) as request, listen(observe):
+        answer = _answer_question(question, pipeline_language(lang), verdict, use_cache, speculative, context, request,
+                                  reused, covered, mode, query)
+        request.set(verdict=context.verdict, rejected=answer is None, compaction_tokens_saved=sum(saved),
+                    reused_evidence=len(reused), search_skipped=covered, follow_up=bool(context.conversation))
+        rendered = translate(answer, lang) if TRANSLATION else answer
+    if session is not None and answer is not None:
+        session.record(question, answer, evidence, context.verdict)
+    return rendered
+
+def _answer_question(question, lang, verdict, use_cache, speculative, context, request, reused=(), covered=False,
+                     mode=CREW, query=None):
+    # An answer that leans on the conversation only fits this conversation
+    cache = answer_cache if use_cache and not context.conversation else None
+    if cache is not None and verdict is None:
+        # A cached answer means the question was accepted before, so skip classification
+        for path in (SCIENCE, SEAQIS):
+            cached = cache.get(question, lang, cache_path(path, mode))
+            if cached is not None:
+                context.verdict = path
+                request.set(cache_hit=True)
+                emit("classified", verdict=path)
+                emit("cache_hit")
+                return cached
+
+    speculation = None
+    if verdict is None:
+        # Evidence of earlier turns that covers the question makes the search unnecessary
+        enabled = (SPECULATIVE_SEARCH if speculative is None else speculative) and not covered
+        verdict, speculation = classify_speculatively(question, lambda text, use_llm=True: classify_turn(text, context, use_llm),
+                                                     enabled, query)
+    context.verdict = verdict
+    emit("classified", verdict=verdict)
+    if verdict == REJECT:
+        return None
+    if reused:
+        speculation = EvidenceSearch(reused, speculation)
+
+    if cache is not None:
+        cached = cache.get(question, lang, cache_path(verdict, mode))
+        if cached is not None:
+            if speculation is not None:
+                speculation.discard()
+            request.set(cache_hit=True)
+            emit("cache_hit")
+            return cached
+        request.set(cache_hit=False)
+
+    def execute(publish):
+        # The leader's events also go to every session waiting on this run
+        with listen(publish):
+            return run_pipeline(question, lang, verdict, context=context, speculation=speculation, mode=mode)
+
+    key = (normalize_question(question), lang.lower(), verdict, mode, context.conversation)
+    answer, shared = pipeline_flight.do(key, execute, forwarder())
+    request.set(coalesced=shared)
+    if shared:
+        if speculation is not None:
+            speculation.discard()
+    elif cache is not None:
+        cache.set(question, lang, cache_path(verdict, mode), answer)
+    return answer
+
+async def aanswer_question(question, lang, budget=None, use_cache=True, context=None, speculative=None, session=None,
+                           mode=None):
+    """answer_question within a latency budget (a Budget or total seconds)
+
+    Classification, search and answer each get a slice of the budget; an
+    overrunning stage degrades instead of failing (see AI_Component.Deadline).
+    A cut answer is returned with a notice and context.partial set, and is not
+    cached; the complete answer still reaches the cache when the crew finishes.
+    How the budget was used is in context.budget_report. Concurrent identical
+    questions are not coalesced on this path, each keeps its own deadline.
+    A session and mode work as in answer_question. The translation may use
+    what is left of the budget; past it the English answer is returned with
+    a notice (the "translation" stage of the report).
+    """
+    mode = execution_mode(mode)
+    if not isinstance(budget, Budget):
+        budget = Budget(LATENCY_BUDGET if budget is None else budget)
+    if context is None:
+        context = RequestContext(question, lang)
+    evidence = []
+
+    def observe(kind, data):
+        if kind == "evidence":
+            evidence.extend(data["results"])
+
+    query, reused, covered = open_turn(session, question, context)
+    with span("request", lang=lang, budget=budget.total, mode=mode) as request, budget.applied(), listen(observe):
+        try:
+            answer = await _aanswer_question(question, pipeline_language(lang), budget, use_cache, speculative, context,
+                                             request, reused, covered, mode, query)
+            rendered = answer
+            if TRANSLATION and answer is not None and not is_canonical(lang):
+                rendered = await translate_within(budget, answer, lang)
+        finally:
+            context.budget_report = budget.report()
+        request.set(verdict=context.verdict, rejected=answer is None, partial=context.partial,
+                    budget_overran=context.budget_report["overran"], reused_evidence=len(reused), search_skipped=covered,
+                    follow_up=bool(context.conversation))
+    if session is not None and answer is not None:
+        session.record(question, answer, evidence, context.verdict)
+    return rendered
+
+async def _aanswer_question(question, lang, budget, use_cache, speculative, context, request, reused=(), covered=False,
+                            mode=CREW, query=None):
+    cache = answer_cache if use_cache and not context.conversation else None
+    if cache is not None:
+        for path in (SCIENCE, SEAQIS):
+            cached = cache.get(question, lang, cache_path(path, mode))
+            if cached is not None:
+                context.verdict = path
+                request.set(cache_hit=True)
+                emit("classified", verdict=path)
+                emit("cache_hit")
+                return cached
+        request.set(cache_hit=False)
+
+    enabled = (SPECULATIVE_SEARCH if speculative is None else speculative) and not covered
+    verdict, speculation = await classify_within(budget, question, lambda text, use_llm=True: classify_turn(text, context, use_llm),
+                                                 enabled, query)
+    context.verdict = verdict
+    emit("classified", verdict=verdict)
+    if verdict == REJECT:
+        return None
+    if reused:
+        speculation = EvidenceSearch(reused, speculation)
+
+    # The complete answer of a crew that overran its slice is still worth caching
+    path = cache_path(verdict, mode)
+    late = (lambda answer: cache.set(question, lang, path, answer)) if cache is not None else None
+    if verdict == SEAQIS:
+        answer = await QisAgentChain(question, lang).aprocess_question(budget, verdict=verdict, context=context,
+                                                                       speculation=speculation, late=late, mode=mode)
+    else:
+        prefetched = await search_within(budget, speculation)
+        if mode == FAST:
+            run = lambda: fast_answer(with_conversation(question, context), lang, prefetched, question)
+            answer = await answer_within(budget, context, run, prefetched, late, lang)
+        else:
+            answer = await QisCrew(with_conversation(question, context), lang, prefetched).akickoff(budget, context, late)
+    if cache is not None and not context.partial:
+        cache.set(question, lang, path, answer)
+    return answer
+
+def stream_collector(put, lang=CANONICAL_LANGUAGE):
+    """Turn raw pipeline events into UI stream events and pass them to put(kind, data)
+
+    Tokens lose the agent's ReAct preamble and the first finished crew task
+    (the research) becomes "writing_started". Tokens are only streamed when
+    the crew writes in lang itself; a translated answer arrives with "done".
+    """
+    stream_tokens = is_canonical(lang) or not TRANSLATION
+    tokens = FinalAnswerFilter()
+    tasks_finished = 0
+
+    def collect(kind, data):
+        nonlocal tasks_finished
+        if kind == "token":
+            if not stream_tokens:
+                return
+            text = tokens.feed(data["text"])
+            if text:
+                put("token", {"text": text})
+        elif kind == "task_finished":
+            tasks_finished += 1
+            # The research task is done, the answer agent starts writing
+            if tasks_finished == 1:
+                put("writing_started", {})
+        elif kind != "evidence":
+            put(kind, data)
+
+    return collect
+
+def stream_answer(question, lang, verdict=None, use_cache=True, budget=LATENCY_BUDGET, session=None, mode=None):
+    """Run answer_question on the pipeline pool and yield its events as they happen
+
+    Yields (kind, data) tuples: "classified", "cache_hit", "search_started",
+    "search_finished", "writing_started", "token" and finally "done" (with the
+    answer, None when rejected) or "error". With a budget (seconds) the
+    answer comes from aanswer_question and "done" also carries "partial" and
+    the "budget" report. session carries the conversation across calls;
+    mode picks the crew or the single-call fast path.
+    """
+    events = queue.Queue()
+    collect = stream_collector(lambda kind, data: events.put((kind, data)), lang)
+
+    def worker():
+        with listen(collect):
+            try:
+                if budget and verdict is None:
+                    context = RequestContext(question, lang)
+                    answer = asyncio.run(aanswer_question(question, lang, budget, use_cache, context, session=session,
+                                                          mode=mode))
+                    events.put(("done", {"answer": answer, "partial": context.partial, "budget": context.budget_report}))
+                else:
+                    answer = answer_question(question, lang, verdict, use_cache, session=session, mode=mode)
+                    events.put(("done", {"answer": answer}))
+            except Exception as error:
+                events.put(("error", {"error": error}))
+
+    pipeline_pool.submit(contextvars.copy_context().run, worker)
+    while True:
+        kind, data = events.get()
+        yield kind, data
+        if kind in ("done", "error"):
+            return
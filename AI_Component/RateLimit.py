@@ -0,0 +1,255 @@
+"""Client-side rate limiting shared by every outbound OpenAI, Groq and Tavily call
+
+Each provider has a token bucket for requests per minute and one for tokens
+per minute. Callers queue on the provider's limiter; interactive requests
+are served before batch ones (set with `request_priority("batch")`). Limits
+are learned from x-ratelimit-* response headers, and a 429 pauses the whole
+provider for its Retry-After instead of letting every caller retry at once.
+The httpx transports in AI_Component/HttpClients.py put this in front of
+the actual clients.
+
+    QIS_RATE_<PROVIDER>_RPM / QIS_RATE_<PROVIDER>_TPM   starting limits (0 = none)
+"""
+from AI_Component.Tracing import metrics
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+import os
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Starting limits until the provider's headers say otherwise
+DEFAULT_LIMITS = {
+    "openai": (500, 30000),
+    "groq": (30, 6000),
+    "tavily": (100, 0),
+}
+
+# Longest a call waits in the queue before it fails instead
+MAX_WAIT = float(os.getenv("QIS_RATE_MAX_WAIT", "120"))
+# How often a coroutine queued behind another caller checks whether its turn came
+ASYNC_POLL = float(os.getenv("QIS_RATE_ASYNC_POLL", "0.05"))
+BACKOFF_BASE = float(os.getenv("QIS_RATE_BACKOFF_BASE", "0.5"))
+BACKOFF_CAP = float(os.getenv("QIS_RATE_BACKOFF_CAP", "20"))
+
+_priority = contextvars.ContextVar("qis_request_priority", default="interactive")
+
+@contextmanager
+def request_priority(level):
+    """Run the block's outbound calls at this priority ("interactive" or "batch")"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority():
+    return _priority.get()
+
+def backoff(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff, so retrying callers spread out"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+_duration = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+def parse_reset(value):
+    """Seconds from an OpenAI reset header like "1s", "6m0s" or "250ms" """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = _duration.findall(value)
+    return sum(float(number) * units[unit] for number, unit in parts) if parts else None
+
+class RateLimitTimeout(Exception):
+    """A call waited longer than MAX_WAIT for its provider's capacity"""
+
+class TokenBucket:
+    """Refills `limit` units per minute up to `limit`; limit 0 means unlimited"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.level = float(limit)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.limit:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+    def wait_time(self, amount):
+        if not self.limit:
+            return 0.0
+        # A single call larger than the bucket only waits for a full bucket
+        needed = min(amount, self.limit) - self.level
+        return max(0.0, needed * 60 / self.limit)
+
+    def take(self, amount):
+        if self.limit:
+            self.level -= amount
+
+    def set_limit(self, limit):
+        if limit and limit != self.limit:
+            self.level = min(self.level, limit) if self.limit else float(limit)
+            self.limit = limit
+
+class ProviderLimiter:
+    """Priority queue in front of a provider's request and token buckets"""
+
+    def __init__(self, name, requests_per_minute=0, tokens_per_minute=0):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _wait_time(self, tokens, now):
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return max(self.paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def _ticket(self, priority):
+        return PRIORITIES.get(priority or current_priority(), 1), next(self._sequence)
+
+    def acquire(self, tokens=0, priority=None, max_wait=MAX_WAIT):
+        """Block until the call may go out; returns the seconds spent waiting"""
+        ticket = self._ticket(priority)
+        start = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now) if self._waiting[0] == ticket else None
+                    if wait is not None and wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        return now - start
+                    if now - start + (wait or 0) > max_wait:
+                        raise RateLimitTimeout(f"{self.name}: no capacity within {max_wait:g}s")
+                    # Only the head of the queue sleeps on the buckets, the rest wait for their turn
+                    self._condition.wait(timeout=wait if wait is not None else max_wait - (now - start))
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    async def aacquire(self, tokens=0, priority=None, max_wait=MAX_WAIT):
+        """acquire for coroutines, which wait with asyncio.sleep instead of holding a thread
+
+        Shares the queue with the blocking callers; the head of the queue
+        sleeps for the computed delay, the others poll for their turn.
+        """
+        ticket = self._ticket(priority)
+        start = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+        try:
+            while True:
+                with self._condition:
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now) if self._waiting[0] == ticket else None
+                    if wait is not None and wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        return now - start
+                if now - start + (wait or 0) > max_wait:
+                    raise RateLimitTimeout(f"{self.name}: no capacity within {max_wait:g}s")
+                await asyncio.sleep(wait if wait is not None else min(ASYNC_POLL, max_wait - (now - start)))
+        finally:
+            with self._condition:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    def settle(self, estimated, actual):
+        """Correct the token bucket once the real usage of a call is known"""
+        if actual is None:
+            return
+        with self._condition:
+            self.tokens.take(actual - estimated)
+
+    def observe_headers(self, headers):
+        """Adopt the limits and remaining capacity the provider reports"""
+        def number(name):
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        with self._condition:
+            now = time.monotonic()
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                limit = number(f"x-ratelimit-limit-{kind}")
+                remaining = number(f"x-ratelimit-remaining-{kind}")
+                if limit:
+                    bucket.refill(now)
+                    bucket.set_limit(limit)
+                if remaining is not None and bucket.limit:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, remaining)
+            self._condition.notify_all()
+
+    def pause(self, seconds):
+        """Hold every caller of this provider, after a 429"""
+        with self._condition:
+            self.throttled += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def queue_depth(self):
+        with self._condition:
+            depth = {level: 0 for level in PRIORITIES}
+            names = {rank: level for level, rank in PRIORITIES.items()}
+            for rank, _ in self._waiting:
+                depth[names[rank]] += 1
+            return depth
+
+class RateLimiter:
+    """Process-wide set of provider limiters"""
+
+    def __init__(self, limits=DEFAULT_LIMITS):
+        self.limits = limits
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def provider(self, name):
+        if name not in self._providers:
+            with self._lock:
+                if name not in self._providers:
+                    rpm, tpm = self.limits.get(name, (0, 0))
+                    rpm = int(os.getenv(f"QIS_RATE_{name.upper()}_RPM", rpm))
+                    tpm = int(os.getenv(f"QIS_RATE_{name.upper()}_TPM", tpm))
+                    self._providers[name] = ProviderLimiter(name, rpm, tpm)
+        return self._providers[name]
+
+    def queue_depths(self):
+        return {((("provider", name), ("priority", level))): depth
+                for name, limiter in list(self._providers.items())
+                for level, depth in limiter.queue_depth().items()}
+
+    def stats(self):
+        return {name: {"rpm": limiter.requests.limit, "tpm": limiter.tokens.limit,
+                       "queued": limiter.queue_depth(), "throttled": limiter.throttled}
+                for name, limiter in list(self._providers.items())}
+
+    def throttled(self):
+        return {(("provider", name),): limiter.throttled for name, limiter in list(self._providers.items())}
+
+# Initialize global rate limiter instance
+rate_limiter = RateLimiter()
+
+metrics.gauge("qis_rate_limit_queue_depth", "Outbound calls waiting for provider capacity", rate_limiter.queue_depths)
+metrics.gauge("qis_rate_limit_throttled_total", "429 responses received per provider", rate_limiter.throttled, kind="counter")
@@ -0,0 +1,158 @@
+from AI_Component.Llms import get_llm, LLM_PROVIDER, ANSWER_LLM_PROVIDER
+from AI_Component.Tracing import span
+from AI_Component.Events import listen
+import re
+import threading
+import time
+import os
+
+# Model tiers per agent role, cheapest first; QIS_ROUTE_<ROLE>="tier,tier" overrides
+DEFAULT_ROUTES = {
+    "validation": ["openai_mini", "groq"],
+    "search": ["openai_mini", LLM_PROVIDER],
+    "answer_easy": ["openai_mini_stream", ANSWER_LLM_PROVIDER],
+    "answer_hard": [ANSWER_LLM_PROVIDER, "openai_mini_stream"],
+    "translation": ["openai_mini", LLM_PROVIDER],
+}
+
+# Seconds a tier is moved to the back of its route after an error or timeout
+TIER_COOLDOWN = float(os.getenv("QIS_TIER_COOLDOWN", "30"))
+
+# Signals that a question needs the strongest model for the final answer
+_hard_question = re.compile(
+    r"\b(why|compare|contrast|design|lesson plan|rubric|curriculum|assess|evaluate|step[- ]by[- ]step|"
+    r"mengapa|bandingkan|rancang|rencana pembelajaran|kurikulum|penilaian|evaluasi)\b"
+)
+
+def load_routes():
+    routes = {}
+    for role, tiers in DEFAULT_ROUTES.items():
+        configured = os.getenv(f"QIS_ROUTE_{role.upper()}")
+        routes[role] = [tier.strip() for tier in configured.split(",")] if configured else list(tiers)
+    return routes
+
+def question_difficulty(question):
+    """Cheap heuristic: long, multi-part or analytical questions are "hard" """
+    if not question:
+        return "hard"
+    text = question.lower()
+    if len(text.split()) > 25 or text.count("?") > 1 or _hard_question.search(text):
+        return "hard"
+    return "easy"
+
+class TierStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self):
+        successes = self.calls - self.errors
+        return {"calls": self.calls, "errors": self.errors, "max_seconds": round(self.max_seconds, 3),
+                "avg_seconds": round(self.total_seconds / successes, 3) if successes else None}
+
+class ModelRouter:
+    """Pick the model tier per agent role and question difficulty, falling back on failure"""
+
+    def __init__(self, routes=None, cooldown=TIER_COOLDOWN):
+        self.routes = routes or load_routes()
+        self.cooldown = cooldown
+        self._failed_at = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def tiers(self, role, question=None):
+        """Tiers to try for a role, healthy ones first"""
+        if role == "answer":
+            role = f"answer_{question_difficulty(question)}"
+        now = time.monotonic()
+        with self._lock:
+            cooling = {tier for tier, failed_at in self._failed_at.items() if now - failed_at < self.cooldown}
+        tiers = self.routes[role]
+        return [tier for tier in tiers if tier not in cooling] + [tier for tier in tiers if tier in cooling]
+
+    def record(self, name, seconds, error=None):
+        with self._lock:
+            stats = self._stats.setdefault(name, TierStats())
+            stats.calls += 1
+            if error is not None:
+                stats.errors += 1
+                self._failed_at[name] = time.monotonic()
+            else:
+                stats.total_seconds += seconds
+                stats.max_seconds = max(stats.max_seconds, seconds)
+                self._failed_at.pop(name, None)
+
+    def invoke(self, role, prompt, question=None):
+        """Send one prompt to the first tier that answers; returns (text, tier)"""
+        last_error = None
+        for tier in self.tiers(role, question):
+            start = time.perf_counter()
+            with span("llm", role=role, model=tier) as current:
+                try:
+                    llm = get_llm(tier)
+                    # The streaming tiers are crewai LLMs, which take the prompt through call()
+                    response = llm.invoke(prompt) if hasattr(llm, "invoke") else llm.call(prompt)
+                except Exception as error:
+                    self.record(tier, time.perf_counter() - start, error)
+                    current.fail(error)
+                    last_error = error
+                    continue
+                current.set_usage(getattr(response, "usage_metadata", None))
+            self.record(tier, time.perf_counter() - start)
+            return getattr(response, "content", response), tier
+        raise last_error or RuntimeError(f"no model tier configured for role '{role}'")
+
+    def crew_plans(self, question):
+        """(search tier, answer tier) pairs to try for a two-agent crew run"""
+        search = self.tiers("search")
+        answer = self.tiers("answer", question)
+        return [(search[min(i, len(search) - 1)], answer[min(i, len(answer) - 1)])
+                for i in range(max(len(search), len(answer)))]
+
+    def run_crew(self, question, attempt, searches=True):
+        """Call attempt(search_tier, answer_tier) along the cascade until one succeeds
+
+        A crew whose answer already streamed tokens is not retried, the next
+        tier would write a second answer after the first one's start. A
+        failure counts against the search tier until the crew's first task
+        finishes, then against the answer tier (always, when searches is
+        False and the crew has no search task).
+        """
+        last_error = None
+        for search_tier, answer_tier in self.crew_plans(question):
+            start = time.perf_counter()
+            progress = {"tasks": 0, "streamed": False}
+
+            def watch(kind, data):
+                if kind == "task_finished":
+                    progress["tasks"] += 1
+                elif kind == "token":
+                    progress["streamed"] = True
+
+            with span("crew", model=answer_tier, search_model=search_tier) as current:
+                try:
+                    with listen(watch):
+                        result = attempt(search_tier, answer_tier)
+                except Exception as error:
+                    failed_tier = search_tier if searches and not progress["tasks"] else answer_tier
+                    self.record(f"crew:{search_tier}+{answer_tier}", time.perf_counter() - start, error)
+                    self.record(failed_tier, 0.0, error)
+                    current.fail(error)
+                    if progress["streamed"]:
+                        raise
+                    last_error = error
+                    continue
+                # crewai's CrewOutput reports the tokens of all its agents
+                current.set_usage(getattr(result, "token_usage", None))
+            self.record(f"crew:{search_tier}+{answer_tier}", time.perf_counter() - start)
+            return result
+        raise last_error
+
+    def stats(self):
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+# Initialize global model router instance
+model_router = ModelRouter()
@@ -0,0 +1,240 @@
+"""Per-session conversation state, so follow-up questions reuse earlier evidence
+
+A ConversationSession keeps the search evidence of the last turns and a
+rolling summary of the conversation, both bounded by size and age. Every
+question is classified, cached and coalesced as asked. For any question the
+pipeline hands the still-relevant evidence of earlier turns to the research
+task as prefetched results, and only searches the web when that evidence does
+not cover the question. When the question also looks like a follow-up
+("and how do I assess that?": short, leaning on a pronoun or a connective),
+the pipeline
+
+- searches it together with the question it follows up on;
+- gives the answer prompt the rolling summary of the earlier turns, and
+  neither reads nor writes the answer cache, as the answer only fits this
+  conversation;
+- lets a follow-up the classifier rejects on its own words continue the
+  path of the turn it follows up on.
+
+The Streamlit app keeps one session in st.session_state; answer_question and
+stream_answer take it as session=. api.py keeps sessions by the "session" id
+of the request body in a SessionStore, in the memory of its replica: with
+several API replicas the proxy has to send a session to the same replica, or
+its follow-ups start a new conversation.
+
+    QIS_SESSION_TURNS            turns whose evidence is kept (5)
+    QIS_SESSION_EVIDENCE_TOKENS  evidence kept across those turns (3000)
+    QIS_SESSION_MAX_AGE          seconds after which a turn is forgotten (1800)
+    QIS_SESSION_SUMMARY_TOKENS   length of the rolling summary (300)
+    QIS_SESSION_REUSE_COVERAGE   share of the question's terms the reused
+                                 evidence must cover to skip the search (0.8)
+    QIS_SESSION_FOLLOW_UP_WORDS  longest question read as a follow-up (12)
+    QIS_SESSION_STORE_SIZE       sessions api.py keeps at most (1000)
+"""
+from AI_Component.Compaction import BM25, canonical_url
+from AI_Component.ToolsLib.TavilySearch.client import merge_results
+from AI_Component.knowledge.index import index_terms, content_terms
+from AI_Component.Text import estimate_tokens
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+from collections import OrderedDict
+import re
+import threading
+import time
+import os
+
+SESSION_TURNS = int(os.getenv("QIS_SESSION_TURNS", "5"))
+SESSION_EVIDENCE_TOKENS = int(os.getenv("QIS_SESSION_EVIDENCE_TOKENS", "3000"))
+SESSION_MAX_AGE = float(os.getenv("QIS_SESSION_MAX_AGE", "1800"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("QIS_SESSION_SUMMARY_TOKENS", "300"))
+REUSE_COVERAGE = float(os.getenv("QIS_SESSION_REUSE_COVERAGE", "0.8"))
+# Evidence results handed to a follow-up, at most
+REUSE_RESULTS = int(os.getenv("QIS_SESSION_REUSE_RESULTS", "5"))
+FOLLOW_UP_WORDS = int(os.getenv("QIS_SESSION_FOLLOW_UP_WORDS", "12"))
+SESSION_STORE_SIZE = int(os.getenv("QIS_SESSION_STORE_SIZE", "1000"))
+
+# A question that only makes sense after the previous one: it opens with a
+# connective or refers back with a pronoun (english and indonesian)
+_follow_up_opening = re.compile(r"^\s*(and|but|also|so|then|what about|how about|dan|lalu|terus|kalau|bagaimana dengan)\b", re.IGNORECASE)
+_follow_up_reference = re.compile(r"\b(it|its|that|this|these|those|they|them|their|there|itu|ini|tersebut|mereka|nya)\b", re.IGNORECASE)
+
+_first_sentence = re.compile(r"(?<=[.!?])\s")
+_heading = re.compile(r"^\s*#.*$", re.MULTILINE)
+_markdown = re.compile(r"[#*_`>\[\]]+|\(https?://[^)]*\)")
+
+def looks_like_follow_up(question, max_words=FOLLOW_UP_WORDS):
+    """A short question that opens with a connective, refers back with a pronoun, or is a word or two"""
+    words = question.split()
+    if not words or len(words) > max_words:
+        return False
+    return len(words) <= 2 or bool(_follow_up_opening.search(question) or _follow_up_reference.search(question))
+
+def gist(answer, max_words=30):
+    """First sentence of an answer without headings and markdown, at most max_words words"""
+    text = _markdown.sub("", _heading.sub("", answer or "")).strip()
+    sentence = _first_sentence.split(text, 1)[0] if text else ""
+    words = sentence.split()
+    return " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+
+@dataclass
+class Turn:
+    question: str
+    answer_gist: str
+    evidence: List[dict] = field(default_factory=list)
+    verdict: Optional[str] = None
+    at: float = field(default_factory=time.monotonic)
+
+    def tokens(self):
+        return sum(estimate_tokens(result["content"]) for result in self.evidence)
+
+class EvidenceSearch:
+    """Stand-in for a SpeculativeSearch: the reused evidence, plus the web search's results if one runs"""
+
+    def __init__(self, evidence, speculation=None):
+        self.evidence = evidence
+        self.speculation = speculation
+        self.future = Future()
+        if speculation is None:
+            self.future.set_result(list(evidence))
+        else:
+            speculation.future.add_done_callback(self._merge)
+
+    def _merge(self, done):
+        found = None if done.cancelled() or done.exception() else done.result()
+        self.future.set_result(merge_results([self.evidence, found or []]))
+
+    def results(self, timeout=None):
+        try:
+            return self.future.result(timeout=timeout)
+        except Exception:
+            return list(self.evidence)
+
+    def discard(self):
+        if self.speculation is not None:
+            self.speculation.discard()
+
+class ConversationSession:
+    """Bounded memory of one user's conversation: recent turns, their evidence and a rolling summary"""
+
+    def __init__(self, max_turns=SESSION_TURNS, max_evidence_tokens=SESSION_EVIDENCE_TOKENS,
+                 max_age=SESSION_MAX_AGE, summary_tokens=SESSION_SUMMARY_TOKENS):
+        self.max_turns = max_turns
+        self.max_evidence_tokens = max_evidence_tokens
+        self.max_age = max_age
+        self.summary_tokens = summary_tokens
+        self.turns = []
+        # Gists of turns that no longer keep their evidence, oldest first
+        self.summary = []
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        """Forget turns older than max_age, then drop evidence beyond the turn and token limits"""
+        self.turns = [turn for turn in self.turns if now - turn.at <= self.max_age]
+        if not self.turns:
+            self.summary = []
+        while len(self.turns) > self.max_turns:
+            self._summarize(self.turns.pop(0))
+        # The newest turns keep their evidence, older ones give theirs up first
+        total = sum(turn.tokens() for turn in self.turns)
+        for turn in self.turns:
+            while turn.evidence and total > self.max_evidence_tokens:
+                total -= estimate_tokens(turn.evidence.pop()["content"])
+
+    def _summarize(self, turn):
+        self.summary.append(f"Q: {turn.question} A: {turn.answer_gist}")
+        while self.summary and estimate_tokens("\n".join(self.summary)) > self.summary_tokens:
+            self.summary.pop(0)
+
+    def last_turn(self):
+        with self._lock:
+            self._evict(time.monotonic())
+            return self.turns[-1] if self.turns else None
+
+    def follows(self, question):
+        """The live turn the question follows up on, None when it stands on its own"""
+        if not looks_like_follow_up(question):
+            return None
+        return self.last_turn()
+
+    def search_query(self, question):
+        """What to search for the question: a follow-up together with the question it follows up on"""
+        previous = self.follows(question)
+        return question if previous is None else f"{previous.question} {question}"
+
+    def conversation(self):
+        """Rolling summary of the live conversation for the crew prompt, "" without one"""
+        with self._lock:
+            self._evict(time.monotonic())
+            lines = self.summary + [f"Q: {turn.question} A: {turn.answer_gist}" for turn in self.turns]
+        while lines and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def relevant_evidence(self, question, k=REUSE_RESULTS):
+        """Return (results, covered): earlier evidence relevant to the question, best first
+
+        Ranked on the question's own words, so a change of topic reuses
+        nothing. covered is True when that evidence holds REUSE_COVERAGE of
+        the question's content terms, so no new web search is needed.
+        """
+        with self._lock:
+            self._evict(time.monotonic())
+            evidence = [result for turn in reversed(self.turns) for result in turn.evidence]
+        if not evidence:
+            return [], False
+        documents = [index_terms(f"{result['url']} {result['content']}") for result in evidence]
+        asked = content_terms(question)
+        scores = BM25(documents).scores(asked)
+        ranked = [index for index in sorted(range(len(evidence)), key=lambda index: -scores[index]) if scores[index] > 0][:k]
+        results = [evidence[index] for index in ranked]
+        found = set().union(*(set(documents[index]) for index in ranked)) if ranked else set()
+        coverage = len(asked & found) / len(asked) if asked else 0.0
+        return results, bool(results) and coverage >= REUSE_COVERAGE
+
+    def record(self, question, answer, evidence=(), verdict=None):
+        """Remember a finished turn, its verdict and the search evidence its answer was built from"""
+        unique, seen = [], set()
+        for result in evidence:
+            key = canonical_url(result["url"])
+            if key not in seen and result.get("content"):
+                seen.add(key)
+                unique.append({"url": result["url"], "content": result["content"]})
+        with self._lock:
+            self.turns.append(Turn(question, gist(answer), unique, verdict))
+            self._evict(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self.turns = []
+            self.summary = []
+
+class SessionStore:
+    """Conversations by session id for a server, bounded by count and idle time"""
+
+    def __init__(self, max_sessions=SESSION_STORE_SIZE, max_age=SESSION_MAX_AGE):
+        self.max_sessions = max_sessions
+        self.max_age = max_age
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """The session for the id, a new one for an unknown or expired id; None without an id"""
+        if not session_id:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session, used = self._sessions.pop(session_id, (None, now))
+            if session is None or now - used > self.max_age:
+                session = ConversationSession()
+            # Least recently used first: drop the idle ones, then make room
+            while self._sessions:
+                oldest, (_, used) = next(iter(self._sessions.items()))
+                if now - used <= self.max_age and len(self._sessions) < self.max_sessions:
+                    break
+                del self._sessions[oldest]
+            self._sessions[session_id] = (session, now)
+            return session
+
+    def __len__(self):
+        return len(self._sessions)
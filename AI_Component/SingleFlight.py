@@ -0,0 +1,75 @@
+import threading
+
+class _Call:
+    """One in-flight execution and the events it produced so far"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.history = []
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    # Events are delivered while holding the lock, so a waiter that is still
+    # replaying the history never receives a live event out of order
+    def publish(self, kind, data):
+        with self.lock:
+            self.history.append((kind, data))
+            for subscriber in self.subscribers:
+                subscriber(kind, data)
+
+    def subscribe(self, subscriber):
+        # Replay what the waiter missed, then follow the live events
+        with self.lock:
+            for kind, data in self.history:
+                subscriber(kind, data)
+            self.subscribers.append(subscriber)
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution
+
+    The first caller (the leader) runs the function; callers arriving while it
+    runs wait for the same result, and receive its events through their
+    listener, replayed from the start.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, listener=None):
+        """Return (result, shared); function receives a publish(kind, data) callback"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if listener is not None:
+                call.subscribe(listener)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function(call.publish)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
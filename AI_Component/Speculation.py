@@ -0,0 +1,50 @@
+from AI_Component.ToolsLib.TavilySearch.client import search
+from AI_Component.validator.rules import REJECT
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import os
+
+# Start the web search while the question is still being classified
+SPECULATIVE_SEARCH = os.getenv("QIS_SPECULATIVE_SEARCH", "1") == "1"
+
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("QIS_SPECULATIVE_WORKERS", "8")), thread_name_prefix="qis-speculative")
+
+class SpeculativeSearch:
+    """A web search for the raw question started before its verdict is known"""
+
+    def __init__(self, question):
+        self.question = question
+        # Runs in the request's context so its search span joins the request trace
+        self.future = _pool.submit(contextvars.copy_context().run, search, question)
+
+    def results(self, timeout=None):
+        """Return the prefetched results, or None if the search failed"""
+        try:
+            return self.future.result(timeout=timeout)
+        except Exception:
+            return None
+
+    def discard(self):
+        """Cancel the search if it has not started; a finished one only warms the search cache"""
+        self.future.cancel()
+
+def classify_speculatively(question, classify, enabled=SPECULATIVE_SEARCH, query=None):
+    """Classify the question while its web search (for query, default the question) runs in the background
+
+    classify(question, use_llm) returns None when use_llm is False and the
+    memo, the rules and the local classifier cannot decide. Those run first,
+    so a question they reject never spends a search; the search only starts
+    once the question is accepted or left to the model.
+    Returns (verdict, speculation); speculation is None when the question was
+    rejected or speculation is disabled.
+    """
+    verdict = classify(question, False)
+    if verdict == REJECT:
+        return verdict, None
+    speculation = SpeculativeSearch(query or question) if enabled else None
+    if verdict is None:
+        verdict = classify(question, True)
+    if verdict == REJECT and speculation is not None:
+        speculation.discard()
+        return verdict, None
+    return verdict, speculation
@@ -1,34 +1,59 @@
-from crewai import Task
-from AI_Component.Agents import *
-from AI_Component.Tools import *
+from AI_Component.Agents import Agents
+from AI_Component.Tools import get_web_search
+from AI_Component.Compaction import compact
+from AI_Component.Events import emit
 
+def format_search_results(results, max_chars=600):
+    """Render search results compactly for a task description"""
+    return "\n".join(f"- {result['url']}: {result['content'][:max_chars]}" for result in results)
 
-agents = Agents()
+# Prompt content of the answer task, shared with the single-call fast path
+def general_answer_description(question):
+    return ("Your task is to: "
+            f"Answer the following science education and STEM teaching question: {question}. "
+            "Use the data that was searched previously. "
+            "Include reference links that support your answer from the provided information.")
+
+def answer_expected_output(lang):
+    return ("Answer created in markdown format like a brief Wikipedia article. "
+            "Answer includes references that can be visited at the end. "
+            f"Answer MUST use the following language: {lang}")
 
 class Tasks:
-    def __init__(self, input, lang):
+    def __init__(self, input, lang, prefetched=None, agents=None):
         self.input=input
         self.lang=lang
+        # Prebuilt agents the tasks are bound to (see AgentPool)
+        self.agents=agents or Agents()
+        # Search results for the question retrieved while it was being classified
+        self.prefetched=prefetched
+    
+    def search_context(self):
+        """Extra task instructions when search results were already retrieved"""
+        if not self.prefetched:
+            return ""
+        results = compact(self.input, self.prefetched)
+        emit("evidence", results=results)
+        return (" These search results were already retrieved for the question:\n"
+                f"{format_search_results(results)}\n"
+                "Use the [WebSearch] tool only for information they do not cover.")
     
     def general_search_task(self):
+        from crewai import Task
         return Task(
             description=f"Your task is to search for data and information about science education and STEM teaching based on the input: {self.input}, along with reference links. "
                          "You will provide your search results to the answer writer. "
-                         "You will use the [WebSearch] tool.",
+                         "You will use the [WebSearch] tool." + self.search_context(),
             expected_output="A comprehensive search result from various sources with their source links. "
                             "Use an easy-to-understand format for composing a comprehensive answer.",
-            agent=agents.data_search(),
-            tools=[WebSearch]
+            agent=self.agents.data_search(),
+            tools=[get_web_search()]
         )
     
     def general_answer_task(self):
+        from crewai import Task
         return Task(
-            description="Your task is to: "
-                        f"Answer the following science education and STEM teaching question: {self.input}. "
-                        "Use the data that was searched previously. "
-                        "Include reference links that support your answer from the provided information.",
-            expected_output="Answer created in markdown format like a brief Wikipedia article. "
-                            "Answer includes references that can be visited at the end. "
-                            f"Answer MUST use the following language: {self.lang}",
-            agent=agents.general_answer()
+            description=general_answer_description(self.input),
+            expected_output=answer_expected_output(self.lang),
+            agent=self.agents.general_answer()
         )
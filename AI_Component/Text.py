@@ -0,0 +1,21 @@
+import re
+
+_whitespace = re.compile(r"\s+")
+_trailing_punctuation = re.compile(r"[\s?!.,;:]+$")
+
+def normalize_question(question):
+    """Normalize a question so trivially different spellings share one key"""
+    if not question:
+        return ""
+    question = _whitespace.sub(" ", question.strip().lower())
+    return _trailing_punctuation.sub("", question)
+
+_word = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    """Lowercase word tokens for local ranking"""
+    return _word.findall(text.lower()) if text else []
+
+def estimate_tokens(text):
+    """Rough LLM token count (about four characters per token) without a tokenizer"""
+    return (len(text) + 3) // 4 if text else 0
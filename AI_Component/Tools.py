@@ -1,3 +1,20 @@
-from AI_Component.ToolsLib.TavilySearch.TavilySearch import TavilySearch
+import threading
 
-WebSearch = TavilySearch()
\ No newline at end of file
+_web_search = None
+_lock = threading.Lock()
+
+def get_web_search():
+    """Build the shared TavilySearch tool on first use (crewai is imported only then)"""
+    global _web_search
+    if _web_search is None:
+        with _lock:
+            if _web_search is None:
+                from AI_Component.ToolsLib.TavilySearch.TavilySearch import TavilySearch
+                _web_search = TavilySearch()
+    return _web_search
+
+def __getattr__(name):
+    # Keeps `from AI_Component.Tools import WebSearch` working
+    if name == "WebSearch":
+        return get_web_search()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,49 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
 from crewai.tools import BaseTool
-import os 
+from concurrent.futures import ThreadPoolExecutor, wait
+from AI_Component.ToolsLib.TavilySearch.client import search, merge_results
+from AI_Component.Events import emit
+from AI_Component.Compaction import compact
+from AI_Component.Deadline import current_budget
+import contextvars
+import os
 
-os.environ['TAVILY_API_KEY'] = os.getenv("tavilyapi_key")
+# Every sub-query is a paid search, so splitting a query on ';' is opt-in
+SPLIT_QUERIES = os.getenv("QIS_SEARCH_SPLIT_QUERIES", "0") == "1"
+SUB_QUERY_SEPARATOR = ";"
 
 class TavilySearch(BaseTool):
     name: str = "TavilySearch"
-    description: str = "Search related information using this tools"
+    description: str = "Search related information using this tools" + (
+        f". Up to 4 queries can be searched at once by separating them with '{SUB_QUERY_SEPARATOR}'"
+        if SPLIT_QUERIES else "")
+    split_queries: bool = SPLIT_QUERIES
+    parallel_queries: bool = True
+    max_parallel: int = 4
+
+    def sub_queries(self, query):
+        """The query as one search, or its ';'-separated parts (at most max_parallel) when splitting is on"""
+        if not self.split_queries:
+            return [query]
+        parts = [part.strip() for part in query.split(SUB_QUERY_SEPARATOR) if part.strip()]
+        return parts[:self.max_parallel] or [query]
     
     def _run(self,query:str):
-        search = TavilySearchResults(k=5)
-        return search.invoke({'query':f'{query}'})
+        emit("search_started", query=query)
+        queries = self.sub_queries(query)
+        budget = current_budget()
+        if budget is None and (len(queries) == 1 or not self.parallel_queries):
+            results = merge_results([search(part) for part in queries])
+        else:
+            executor = ThreadPoolExecutor(max_workers=min(self.max_parallel, len(queries)))
+            # Each sub-query keeps the caller's span and rate-limit priority
+            futures = [executor.submit(contextvars.copy_context().run, search, part) for part in queries]
+            # Under a latency budget only the sub-queries that return in time are used
+            done, _ = wait(futures, timeout=budget.remaining() if budget is not None else None)
+            executor.shutdown(wait=False)
+            results = merge_results([future.result() for future in futures if future in done])
+        # Only deduplicated, relevant passages within the token budget reach the prompt
+        results = compact(query, results)
+        emit("search_finished", query=query, results=len(results))
+        # The conversation session keeps what the answer was built from
+        emit("evidence", results=results)
+        return results
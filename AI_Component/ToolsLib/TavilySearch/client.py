@@ -0,0 +1,75 @@
+from AI_Component.HttpClients import http_client
+from AI_Component.Text import normalize_question
+from AI_Component.cache.ttl_cache import TTLCache
+from AI_Component.Tracing import span
+import threading
+import os 
+
+os.environ['TAVILY_API_KEY'] = os.getenv("tavilyapi_key") or os.getenv("TAVILY_API_KEY", "")
+
+# Search cache configuration
+SEARCH_CACHE_TTL = float(os.getenv("QIS_SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("QIS_SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+class TavilyClient:
+    """Long-lived Tavily client that keeps its HTTP connections open between searches
+
+    Posts to Tavily's REST API itself instead of using the tavily-python SDK,
+    which sends through requests and so could not share the pooled,
+    rate-limited httpx transport.
+    """
+    # Overridable so benchmarks can point the client at a local fake
+    endpoint = os.getenv("QIS_TAVILY_URL", "https://api.tavily.com/search")
+
+    def __init__(self, api_key=None, max_results=5, pool_size=10, timeout=30):
+        self.api_key = api_key or os.environ['TAVILY_API_KEY']
+        self.max_results = max_results
+        self.timeout = timeout
+        # Pooled and rate limited together with every other outbound search
+        self.session = http_client("tavily", timeout=timeout, pool_size=pool_size)
+
+    def search(self, query):
+        response = self.session.post(
+            self.endpoint,
+            json={"api_key": self.api_key, "query": query, "max_results": self.max_results},
+        )
+        response.raise_for_status()
+        # Same shape as langchain's TavilySearchResults output
+        return [{"url": result["url"], "content": result["content"]} for result in response.json().get("results", [])]
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Create the shared Tavily client on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TavilyClient()
+    return _client
+
+# Results shared across runs and users, bounded by memory
+search_cache = TTLCache(ttl=SEARCH_CACHE_TTL, max_entries=4096, max_bytes=SEARCH_CACHE_MAX_BYTES)
+
+def search(query):
+    """Search one query through the shared client and the TTL result cache"""
+    key = normalize_question(query)
+    with span("search", query=query) as current:
+        results = search_cache.get(key)
+        current.set(cache_hit=results is not None)
+        if results is None:
+            results = get_client().search(query)
+            search_cache.set(key, results)
+        current.set(results=len(results))
+    return results
+
+def merge_results(result_lists):
+    """Interleave several result lists, keeping the first occurrence of each URL"""
+    merged, seen = [], set()
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank < len(results) and results[rank]["url"] not in seen:
+                seen.add(results[rank]["url"])
+                merged.append(results[rank])
+    return merged
@@ -0,0 +1,224 @@
+"""Per-stage spans of the answer pipeline, exported as JSON logs and Prometheus metrics
+
+    with span("search", query=query) as current:
+        results = ...
+        current.set(cache_hit=False, results=len(results))
+
+Every finished span is written as one JSON line to the "qis.trace" logger
+(QIS_TRACE_LOG: "stderr", a file path, or "off") and observed in the
+qis_stage_duration_seconds histogram. Spans nest per request through a
+context variable, so one trace_id ties the stages of a question together.
+`metrics.render()` is the Prometheus text exposition, served on /metrics by
+api.py and by start_metrics_server for the Streamlit app (QIS_METRICS_PORT).
+"""
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+import os
+
+TRACE_LOG = os.getenv("QIS_TRACE_LOG", "stderr")
+METRICS_PORT = int(os.getenv("QIS_METRICS_PORT", "0"))
+
+# Seconds; the pipeline spans from sub-millisecond rule matches to minute-long crews
+BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+
+_current = contextvars.ContextVar("qis_current_span", default=None)
+
+logger = logging.getLogger("qis.trace")
+logger.propagate = False
+if TRACE_LOG != "off" and not logger.handlers:
+    _handler = logging.StreamHandler() if TRACE_LOG == "stderr" else logging.FileHandler(TRACE_LOG)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, Prometheus style"""
+
+    def __init__(self, name, help, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.setdefault(labels, [[0] * len(self.buckets), 0, 0.0])
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, count, total) in sorted(self._series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{format_labels(labels + (('le', str(bound)),))} {bucket_count}")
+            lines.append(f"{self.name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._series = {}
+
+    def inc(self, labels, value=1):
+        self._series[labels] = self._series.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{format_labels(labels)} {value}" for labels, value in sorted(self._series.items())]
+        return lines
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+class Metrics:
+    """Process-wide metrics fed by finished spans"""
+
+    def __init__(self):
+        self.durations = Histogram("qis_stage_duration_seconds", "Duration of a pipeline stage")
+        self.tokens = Counter("qis_llm_tokens_total", "LLM tokens used, by stage, model and kind")
+        self.cache = Counter("qis_cache_lookups_total", "Cache lookups by stage and result")
+        self.saved = Counter("qis_prompt_tokens_saved_total", "Prompt tokens removed before reaching a model, by stage")
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span):
+        stage = (("stage", span.name),)
+        with self._lock:
+            self.durations.observe(stage + (("status", span.status),), span.duration)
+            model = span.attributes.get("model")
+            for kind in ("prompt", "completion"):
+                tokens = span.attributes.get(f"{kind}_tokens")
+                if tokens:
+                    self.tokens.inc(stage + (("model", model or "unknown"), ("kind", kind)), tokens)
+            if "cache_hit" in span.attributes:
+                self.cache.inc(stage + (("result", "hit" if span.attributes["cache_hit"] else "miss"),))
+            if span.attributes.get("tokens_saved"):
+                self.saved.inc(stage, span.attributes["tokens_saved"])
+
+    def gauge(self, name, help, read, kind="gauge"):
+        """Register a gauge (or counter) whose labelled values ({labels tuple: value}) are read at scrape time"""
+        self._gauges[name] = (help, read, kind)
+
+    def render(self):
+        with self._lock:
+            lines = self.durations.render() + self.tokens.render() + self.cache.render() + self.saved.render()
+        for name, (help, read, kind) in self._gauges.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{format_labels(labels)} {value}" for labels, value in sorted(read().items())]
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+class Span:
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.status = "ok"
+        self.started_at = time.time()
+        self.start = self.lap_start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def set_usage(self, usage):
+        """Copy token counts from a langchain usage_metadata dict or a crewai UsageMetrics"""
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+        prompt = get("prompt_tokens") or get("input_tokens")
+        completion = get("completion_tokens") or get("output_tokens")
+        if prompt or completion:
+            self.attributes["prompt_tokens"] = self.attributes.get("prompt_tokens", 0) + (prompt or 0)
+            self.attributes["completion_tokens"] = self.attributes.get("completion_tokens", 0) + (completion or 0)
+
+    def fail(self, error):
+        self.status = "error"
+        self.attributes["error"] = f"{type(error).__name__}: {error}"
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        metrics.observe(self)
+        if logger.handlers:
+            logger.info(json.dumps({"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                                    "name": self.name, "start": round(self.started_at, 6),
+                                    "duration_ms": round(self.duration * 1000, 3), "status": self.status,
+                                    **self.attributes}, default=str, ensure_ascii=False))
+
+@contextmanager
+def span(name, **attributes):
+    """Time the block as a child of the current span"""
+    current = Span(name, _current.get(), **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        current.fail(error)
+        raise
+    finally:
+        _current.reset(token)
+        current.finish()
+
+def current_span():
+    return _current.get()
+
+def lap(name, **attributes):
+    """Close a child span running from the parent's previous lap (or start) until now
+
+    For stages that only report their end, like crewai task callbacks.
+    """
+    parent = _current.get()
+    child = Span(name, parent, **attributes)
+    if parent is not None:
+        now = time.perf_counter()
+        child.started_at -= now - parent.lap_start
+        child.start, parent.lap_start = parent.lap_start, now
+    child.finish()
+    return child
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """Serve /metrics on a background thread once per process; no-op when port is 0"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True, name="qis-metrics").start()
+    return _server
@@ -0,0 +1,129 @@
+"""Language as a rendering step: one canonical answer, translated on demand
+
+The crews always write the answer in CANONICAL_LANGUAGE. Another language is
+one call to the router's cheap "translation" tier, cached by the answer's
+hash and the target language, so the same answer in Thai costs one small
+call the first time and nothing after.
+
+Links, URLs and code never reach the model: they are swapped for numbered
+placeholders before the call and put back afterwards, so the markdown
+structure and every reference link survive the translation.
+
+    QIS_TRANSLATION=0   write every answer directly in the requested language
+"""
+from AI_Component.Router import model_router
+from AI_Component.cache.ttl_cache import TTLCache
+from AI_Component.Tracing import span
+from AI_Component.Events import emit
+import hashlib
+import re
+import os
+
+TRANSLATION = os.getenv("QIS_TRANSLATION", "1") == "1"
+CANONICAL_LANGUAGE = "english"
+
+# How the prompt names the languages the UI offers; others are passed through as given
+LANGUAGES = {
+    "english": "English",
+    "indonesian": "Indonesian (Bahasa Indonesia)",
+    "thai": "Thai",
+    "vietnamese": "Vietnamese",
+}
+
+TRANSLATION_CACHE_TTL = float(os.getenv("QIS_TRANSLATION_CACHE_TTL", str(7 * 24 * 3600)))
+TRANSLATION_CACHE_MAX_BYTES = int(os.getenv("QIS_TRANSLATION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Shown under the English answer when it could not be translated in time
+UNTRANSLATED_NOTICE = {
+    "english": "*The answer could not be translated in time, so it is shown in English.*",
+    "indonesian": "*Jawaban belum sempat diterjemahkan, sehingga ditampilkan dalam bahasa Inggris.*",
+    "thai": "*ไม่สามารถแปลคำตอบได้ทันเวลา จึงแสดงคำตอบเป็นภาษาอังกฤษ*",
+    "vietnamese": "*Không thể dịch câu trả lời kịp thời, nên câu trả lời được hiển thị bằng tiếng Anh.*",
+}
+
+TRANSLATION_TEMPLATE = (
+    "Translate the following markdown answer from English to {language}.\n"
+    "Keep the markdown formatting (headings, lists, bold, tables) exactly as it is. "
+    "Copy every placeholder like [[0]] unchanged and in place. "
+    "Keep scientific terms accurate for teachers. "
+    "Reply with the translation only.\n\n"
+    "{text}"
+)
+
+# Fenced code, inline code, the target of a markdown link, then bare URLs
+_protected = re.compile(r"```.*?```|`[^`\n]+`|(?<=\])\([^)\s]+\)|https?://[^\s)\]>]*[^\s)\]>.,;:!?]", re.DOTALL)
+_placeholder = re.compile(r"\[\[(\d+)\]\]")
+
+def is_canonical(lang):
+    return (lang or CANONICAL_LANGUAGE).strip().lower() == CANONICAL_LANGUAGE
+
+def protect(text):
+    """Replace links, URLs and code with [[n]] placeholders; returns (text, originals)"""
+    originals = []
+
+    def hold(match):
+        originals.append(match.group(0))
+        return f"[[{len(originals) - 1}]]"
+
+    return _protected.sub(hold, text), originals
+
+def restore(text, originals):
+    """Put the originals back; any the model dropped are appended so no reference is lost"""
+    used = set()
+
+    def put_back(match):
+        index = int(match.group(1))
+        if index >= len(originals):
+            return match.group(0)
+        used.add(index)
+        return originals[index]
+
+    text = _placeholder.sub(put_back, text)
+    missing = [original.strip("()") for index, original in enumerate(originals) if index not in used and "://" in original]
+    if missing:
+        text += "\n\n" + "\n".join(f"- {url}" for url in missing)
+    return text
+
+def answer_hash(answer):
+    return hashlib.sha1(answer.encode("utf-8")).hexdigest()
+
+# Translations shared across sessions, keyed by (answer hash, language)
+translation_cache = TTLCache(ttl=TRANSLATION_CACHE_TTL, max_entries=4096, max_bytes=TRANSLATION_CACHE_MAX_BYTES)
+
+def cached_translation(answer, lang):
+    """The answer as translate would return it without a model call, None when that needs one"""
+    if not answer or is_canonical(lang):
+        return answer
+    return translation_cache.get((answer_hash(answer), lang.strip().lower()))
+
+def untranslated(answer, lang):
+    """The canonical answer with a notice, in lang where one is known, that it is not translated"""
+    notice = UNTRANSLATED_NOTICE.get((lang or "").strip().lower(), UNTRANSLATED_NOTICE[CANONICAL_LANGUAGE])
+    return f"{answer.rstrip()}\n\n---\n{notice}"
+
+def translate(answer, lang, router=model_router):
+    """Render a canonical answer in lang with at most one small model call
+
+    Returns the answer unchanged for the canonical language or an empty
+    answer, and with a notice when the translation call fails (an English
+    answer beats none). The failure is recorded on the translation span.
+    """
+    if not answer or is_canonical(lang):
+        return answer
+    key = (answer_hash(answer), lang.strip().lower())
+    with span("translation", lang=key[1]) as current:
+        translated = translation_cache.get(key)
+        current.set(cache_hit=translated is not None)
+        if translated is not None:
+            return translated
+        emit("translating", lang=key[1])
+        text, originals = protect(answer)
+        language = LANGUAGES.get(key[1], lang)
+        try:
+            response, _ = router.invoke("translation", TRANSLATION_TEMPLATE.format(language=language, text=text))
+        except Exception as error:
+            current.fail(error)
+            return untranslated(answer, lang)
+        translated = restore(response.strip(), originals)
+        translation_cache.set(key, translated)
+        return translated
@@ -0,0 +1,264 @@
+from AI_Component.Text import normalize_question
+from AI_Component.knowledge.index import content_terms
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# Answer cache configuration
+CACHE_BACKEND = os.getenv("QIS_ANSWER_CACHE", "memory")  # memory, sqlite or off
+CACHE_PATH = os.getenv("QIS_ANSWER_CACHE_PATH", "/data/answer_cache.sqlite")
+CACHE_TTL = float(os.getenv("QIS_ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_SIZE = int(os.getenv("QIS_ANSWER_CACHE_SIZE", "5000"))
+CACHE_SIMILARITY = float(os.getenv("QIS_ANSWER_CACHE_SIMILARITY", "0.85"))
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+class MinHasher:
+    """MinHash signatures over character shingles, banded for LSH lookups"""
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=4, seed=1):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self.permutations = [(rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1)) for _ in range(num_perm)]
+
+    def shingles(self, text):
+        text = f" {text} "
+        if len(text) <= self.shingle_size:
+            return {text}
+        return {text[i:i + self.shingle_size] for i in range(len(text) - self.shingle_size + 1)}
+
+    def signature(self, text):
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big") for shingle in self.shingles(text)]
+        return [min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes) for a, b in self.permutations]
+
+    def band_keys(self, signature):
+        return [f"{band}:" + ".".join(map(str, signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(first, second):
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
+class MemoryBackend:
+    """In-process LRU store, shared by all sessions of one replica"""
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bands = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def candidates(self, band_keys):
+        with self._lock:
+            keys = set()
+            for band_key in band_keys:
+                keys.update(self._bands.get(band_key, ()))
+            return [self._entries[key] for key in keys if key in self._entries]
+
+    def put(self, entry, band_keys):
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            self._entries.move_to_end(entry["key"])
+            entry["band_keys"] = band_keys
+            for band_key in band_keys:
+                self._bands.setdefault(band_key, set()).add(entry["key"])
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._unindex(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._unindex(entry)
+
+    def _unindex(self, entry):
+        for band_key in entry.get("band_keys", ()):
+            keys = self._bands.get(band_key)
+            if keys is not None:
+                keys.discard(entry["key"])
+                if not keys:
+                    del self._bands[band_key]
+
+class SQLiteBackend:
+    """SQLite file store, so processes sharing a local volume reuse each other's answers
+
+    The database runs in WAL mode, which needs shared memory between its
+    readers and writers: only processes on the same host can share the file,
+    and it must not live on a network filesystem (NFS, SMB). A Docker named
+    volume is local to its node, so swarm replicas scheduled on other nodes
+    each keep a cache of their own; pin the services that should share
+    answers to one node.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, lang TEXT, path TEXT, question TEXT, "
+            "answer TEXT, signature TEXT, created REAL, accessed REAL)"
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS bands (band_key TEXT, key TEXT)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS bands_band_key ON bands (band_key)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS answers_accessed ON answers (accessed)")
+
+    def _entry(self, row):
+        key, lang, path, question, answer, signature, created, accessed = row
+        return {"key": key, "lang": lang, "path": path, "question": question, "answer": answer,
+                "signature": json.loads(signature), "created": created, "accessed": accessed}
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE answers SET accessed = ? WHERE key = ?", (time.time(), key))
+            return self._entry(row)
+
+    def candidates(self, band_keys):
+        placeholders = ",".join("?" * len(band_keys))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT DISTINCT answers.* FROM bands JOIN answers ON answers.key = bands.key WHERE bands.band_key IN ({placeholders})",
+                band_keys,
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def put(self, entry, band_keys):
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("DELETE FROM bands WHERE key = ?", (entry["key"],))
+                connection.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (entry["key"], entry["lang"], entry["path"], entry["question"], entry["answer"],
+                     json.dumps(entry["signature"]), entry["created"], entry["accessed"]),
+                )
+                connection.executemany("INSERT INTO bands VALUES (?, ?)", [(band_key, entry["key"]) for band_key in band_keys])
+                # LRU eviction of everything beyond max_entries
+                connection.execute(
+                    "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                connection.execute("DELETE FROM bands WHERE key NOT IN (SELECT key FROM answers)")
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def delete(self, key):
+        with self._lock:
+            self._connection.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self._connection.execute("DELETE FROM bands WHERE key = ?", (key,))
+
+class AnswerCache:
+    """Answer cache keyed on normalized question, language and pipeline path
+
+    Exact repeats are found by key; near-duplicates ("What programs does
+    SEAMEO QIS run for science teachers" vs "... for the science teachers?")
+    through MinHash LSH buckets. A near-duplicate is
+    only served when it also has the same content words and numbers, so
+    "grade 6" never gets the "grade 5" answer.
+    """
+
+    def __init__(self, backend, ttl=CACHE_TTL, similarity=CACHE_SIMILARITY, hasher=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.similarity = similarity
+        self.hasher = hasher or MinHasher()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, outcome):
+        with self._stats_lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    @staticmethod
+    def make_key(question, lang, path):
+        raw = f"{path}|{lang.lower()}|{normalize_question(question)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _fresh(self, entry):
+        if time.time() - entry["created"] <= self.ttl:
+            return True
+        self.backend.delete(entry["key"])
+        return False
+
+    @staticmethod
+    def question_terms(question):
+        """Content words and numbers of a question; stray letters of contractions ("what's") do not count"""
+        return {term for term in content_terms(question) if len(term) > 1 or term.isdigit()}
+
+    def get(self, question, lang, path):
+        """Return a cached answer for the question or a near-duplicate of it, else None"""
+        entry = self.backend.get(self.make_key(question, lang, path))
+        if entry is not None and self._fresh(entry):
+            self._count("hits")
+            return entry["answer"]
+
+        normalized = normalize_question(question)
+        signature = self.hasher.signature(normalized)
+        terms = self.question_terms(normalized)
+        best, best_score = None, self.similarity
+        for candidate in self.backend.candidates(self.hasher.band_keys(signature)):
+            if candidate["lang"] != lang.lower() or candidate["path"] != path:
+                continue
+            if self.question_terms(candidate["question"]) != terms:
+                continue
+            score = self.hasher.similarity(signature, candidate["signature"])
+            if score >= best_score and self._fresh(candidate):
+                best, best_score = candidate, score
+        if best is not None:
+            self.backend.get(best["key"])
+            self._count("near_hits")
+            return best["answer"]
+
+        self._count("misses")
+        return None
+
+    def set(self, question, lang, path, answer):
+        normalized = normalize_question(question)
+        signature = self.hasher.signature(normalized)
+        now = time.time()
+        entry = {"key": self.make_key(question, lang, path), "lang": lang.lower(), "path": path,
+                 "question": normalized, "answer": answer, "signature": signature, "created": now, "accessed": now}
+        self.backend.put(entry, self.hasher.band_keys(signature))
+
+    def stats(self):
+        with self._stats_lock:
+            return {"hits": self.hits, "near_hits": self.near_hits, "misses": self.misses}
+
+def create_answer_cache(backend=CACHE_BACKEND):
+    """Build the configured answer cache, or None when caching is turned off"""
+    if backend == "off":
+        return None
+    if backend == "sqlite":
+        return AnswerCache(SQLiteBackend())
+    return AnswerCache(MemoryBackend())
+
+# Initialize global answer cache instance
+answer_cache = create_answer_cache()
@@ -0,0 +1,214 @@
+from AI_Component.Text import tokenize
+from collections import Counter
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+# English and Indonesian function words that say nothing about what a question asks
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me of on or the their there to what when where which who
+why with you your about tell please that this these those
+ada adalah apa apakah bagaimana bisa dan dari dengan di dimana ini itu ke kapan mana saja siapa untuk yang tentang tersebut
+""".split())
+
+_posting = struct.Struct("<II")
+
+def stem(term):
+    """Very light suffix stripping so "programnya", "programmes" and "program" meet"""
+    for suffix in ("nya", "lah", "kah"):
+        if term.endswith(suffix) and len(term) > len(suffix) + 3:
+            term = term[:-len(suffix)]
+            break
+    if term.endswith("ies") and len(term) > 5:
+        term = term[:-3] + "y"
+    elif term.endswith("s") and not term.endswith("ss") and len(term) > 4:
+        term = term[:-1]
+    if term.endswith("mme"):
+        term = term[:-2]
+    return term
+
+def index_terms(text):
+    # Function words stay in the index (titles are phrased as questions), BM25's idf discounts them
+    return [stem(term) for term in tokenize(text)]
+
+def content_terms(text):
+    return {stem(term) for term in tokenize(text) if term not in STOPWORDS}
+
+def document_hash(document):
+    return hashlib.sha1(json.dumps(document, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class Segment:
+    """One immutable piece of the index: documents, a term dictionary and memory-mapped postings
+
+    <name>.docs.json      documents of the segment, in local order
+    <name>.terms.json     {term: [first posting, posting count]}
+    <name>.postings       (local document, term frequency) pairs as little-endian uint32
+    """
+
+    def __init__(self, directory, name):
+        self.name = name
+        base = os.path.join(directory, name)
+        with open(base + ".docs.json", encoding="utf-8") as file:
+            self.documents = json.load(file)
+        with open(base + ".terms.json", encoding="utf-8") as file:
+            self.terms = json.load(file)
+        self._file = open(base + ".postings", "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.postings = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def iter_postings(self, term):
+        entry = self.terms.get(term)
+        if entry is None:
+            return iter(())
+        first, count = entry
+        return _posting.iter_unpack(self.postings[first * _posting.size:(first + count) * _posting.size])
+
+    def close(self):
+        if isinstance(self.postings, mmap.mmap):
+            self.postings.close()
+        self._file.close()
+
+    @staticmethod
+    def write(directory, name, documents):
+        """Write the documents as a new segment; returns per-document term lengths"""
+        postings, lengths = {}, []
+        for local, document in enumerate(documents):
+            terms = index_terms(f"{document.get('title', '')} {document['text']}")
+            lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings.setdefault(term, []).append((local, frequency))
+
+        base = os.path.join(directory, name)
+        dictionary, offset = {}, 0
+        with open(base + ".postings", "wb") as file:
+            for term in sorted(postings):
+                entries = postings[term]
+                dictionary[term] = [offset, len(entries)]
+                file.write(b"".join(_posting.pack(local, frequency) for local, frequency in entries))
+                offset += len(entries)
+        with open(base + ".terms.json", "w", encoding="utf-8") as file:
+            json.dump(dictionary, file, ensure_ascii=False)
+        with open(base + ".docs.json", "w", encoding="utf-8") as file:
+            json.dump([{**document, "length": length} for document, length in zip(documents, lengths)], file, ensure_ascii=False)
+        return lengths
+
+class InvertedIndex:
+    """Segmented on-disk inverted index with BM25 search
+
+    Adding documents writes a new segment and rewrites only the small
+    manifest; a changed or removed document is tombstoned in its old segment,
+    so updates never rewrite existing postings. merge() folds all live
+    documents into a single segment once tombstones pile up.
+    """
+
+    def __init__(self, directory, k1=1.5, b=0.75):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.segments = []
+        self.manifest = {"next_segment": 1, "segments": [], "documents": {}, "deleted": {}}
+        self.load()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def load(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as file:
+                self.manifest = json.load(file)
+            self.segments = [Segment(self.directory, name) for name in self.manifest["segments"]]
+        self._deleted = {name: set(locals_) for name, locals_ in self.manifest["deleted"].items()}
+        self._statistics()
+
+    def _statistics(self):
+        live = [(segment, local, document) for segment in self.segments
+                for local, document in enumerate(segment.documents) if local not in self._deleted.get(segment.name, ())]
+        self.count = len(live)
+        self.average_length = sum(document["length"] for _, _, document in live) / self.count if self.count else 0
+        frequencies = Counter()
+        for segment in self.segments:
+            deleted = self._deleted.get(segment.name, ())
+            for term in segment.terms:
+                frequencies[term] += sum(1 for local, _ in segment.iter_postings(term) if local not in deleted)
+        self.document_frequency = frequencies
+
+    def _save_manifest(self):
+        temporary = self.manifest_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, ensure_ascii=False, indent=1)
+        # Readers see either the old or the new manifest, never a partial one
+        os.replace(temporary, self.manifest_path)
+
+    def sync(self, documents):
+        """Make the index hold exactly these documents; returns (added, removed) counts
+
+        Unchanged documents (same id and content hash) are left in place.
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            wanted = {document["id"]: document for document in documents}
+            known = self.manifest["documents"]
+            changed = [document for key, document in wanted.items()
+                       if known.get(key, {}).get("hash") != document_hash(document)]
+            removed = [key for key in known if key not in wanted]
+            for key in removed + [document["id"] for document in changed if document["id"] in known]:
+                location = known.pop(key)
+                self.manifest["deleted"].setdefault(location["segment"], []).append(location["local"])
+            if changed:
+                name = f"segment_{self.manifest['next_segment']:06d}"
+                self.manifest["next_segment"] += 1
+                Segment.write(self.directory, name, changed)
+                self.manifest["segments"].append(name)
+                for local, document in enumerate(changed):
+                    known[document["id"]] = {"segment": name, "local": local, "hash": document_hash(document)}
+            if changed or removed:
+                self._save_manifest()
+                self.load()
+            return len(changed), len(removed)
+
+    def merge(self):
+        """Rewrite all live documents into one segment and drop the old segment files"""
+        with self._lock:
+            live = [{key: value for key, value in document.items() if key != "length"}
+                    for segment in self.segments for local, document in enumerate(segment.documents)
+                    if local not in self._deleted.get(segment.name, ())]
+            old = list(self.manifest["segments"])
+            self.manifest.update({"segments": [], "documents": {}, "deleted": {}})
+        self.sync(live)
+        for name in old:
+            for extension in (".docs.json", ".terms.json", ".postings"):
+                path = os.path.join(self.directory, name + extension)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def search(self, query, k=3):
+        """Return up to k (score, document, matched terms) for the query, best first"""
+        terms = set(index_terms(query))
+        scores, matched = {}, {}
+        for term in terms:
+            df = self.document_frequency.get(term)
+            if not df:
+                continue
+            idf = math.log(1 + (self.count - df + 0.5) / (df + 0.5))
+            for segment in self.segments:
+                deleted = self._deleted.get(segment.name, ())
+                for local, frequency in segment.iter_postings(term):
+                    if local in deleted:
+                        continue
+                    length = segment.documents[local]["length"]
+                    norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+                    key = (segment.name, local)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    matched.setdefault(key, set()).add(term)
+        segments = {segment.name: segment for segment in self.segments}
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [(scores[key], segments[key[0]].documents[key[1]], matched[key]) for key in best]
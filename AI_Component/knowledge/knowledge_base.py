@@ -0,0 +1,94 @@
+from AI_Component.knowledge.index import InvertedIndex, content_terms
+from AI_Component.Tracing import span
+import argparse
+import json
+import threading
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DOCUMENTS_PATH = os.getenv("QIS_KNOWLEDGE_DOCUMENTS", os.path.join(DATA_DIR, "documents.jsonl"))
+INDEX_DIR = os.getenv("QIS_KNOWLEDGE_INDEX", os.path.join(os.path.dirname(__file__), "index"))
+
+# Answer from local documents only when the best hit is this strong ...
+MIN_SCORE = float(os.getenv("QIS_KNOWLEDGE_MIN_SCORE", "1.0"))
+# ... and the hits cover this share of the question's content terms
+MIN_COVERAGE = float(os.getenv("QIS_KNOWLEDGE_MIN_COVERAGE", "1.0"))
+KNOWLEDGE_RESULTS = int(os.getenv("QIS_KNOWLEDGE_RESULTS", "3"))
+
+# Every document is about the organisation, so its names say nothing about coverage
+TOPIC_TERMS = frozenset(content_terms("seaqis seameo qis qitep science sains"))
+
+def load_documents(path=DOCUMENTS_PATH):
+    """Read knowledge documents ({id, title, url, lang, text}) from a JSONL file"""
+    documents = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                documents.append(json.loads(line))
+    return documents
+
+class KnowledgeBase:
+    """Local SEAQIS documents answered from an on-disk BM25 index"""
+
+    def __init__(self, index, min_score=MIN_SCORE, min_coverage=MIN_COVERAGE):
+        self.index = index
+        self.min_score = min_score
+        self.min_coverage = min_coverage
+
+    def retrieve(self, question, k=KNOWLEDGE_RESULTS):
+        """Return (results, sufficient): results in the {url, content} shape of the search tool
+
+        sufficient is False when the local documents do not cover the question
+        and the web has to be searched instead.
+        """
+        with span("knowledge", documents=self.index.count) as current:
+            hits = self.index.search(question, k)
+            asked = content_terms(question) - TOPIC_TERMS
+            matched = set().union(*(terms for _, _, terms in hits)) if hits else set()
+            coverage = len(asked & matched) / len(asked) if asked else 1.0
+            top_score = hits[0][0] if hits else 0.0
+            sufficient = bool(hits) and top_score >= self.min_score and coverage >= self.min_coverage
+            current.set(hits=len(hits), top_score=round(top_score, 3), coverage=round(coverage, 3),
+                        sufficient=sufficient, cache_hit=sufficient)
+        results = [{"url": document["url"], "content": f"{document['title']}: {document['text']}"}
+                   for _, document, _ in hits]
+        return results, sufficient
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+def get_knowledge_base():
+    """Open the index on first use, syncing it with the documents file"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                index = InvertedIndex(INDEX_DIR)
+                try:
+                    index.sync(load_documents())
+                except OSError as error:
+                    # A read-only deployment still serves the index that was shipped
+                    print(f"Knowledge index not synced: {error}")
+                _knowledge_base = KnowledgeBase(index)
+    return _knowledge_base
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the local SEAQIS knowledge index")
+    parser.add_argument("command", choices=["sync", "merge", "search"])
+    parser.add_argument("query", nargs="?", default="")
+    parser.add_argument("--documents", default=DOCUMENTS_PATH)
+    args = parser.parse_args()
+
+    index = InvertedIndex(INDEX_DIR)
+    if args.command == "sync":
+        added, removed = index.sync(load_documents(args.documents))
+        print(f"{added} documents indexed, {removed} removed, {index.count} live in {len(index.segments)} segments")
+    elif args.command == "merge":
+        index.merge()
+        print(f"{index.count} documents merged into {len(index.segments)} segment")
+    else:
+        results, sufficient = KnowledgeBase(index).retrieve(args.query)
+        for result in results:
+            print(f"- {result['url']}: {result['content'][:120]}")
+        print("sufficient" if sufficient else "insufficient, the web would be searched")
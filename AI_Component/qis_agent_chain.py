@@ -1,105 +1,43 @@
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain.llms import OpenAI
-from crewai import Agent, Task, Crew, Process
-from AI_Component.Agents import Agents
-from AI_Component.Tasks import Tasks
-from AI_Component.Llms import openai
-from AI_Component.Tools import WebSearch
+from AI_Component.Agents import Agents, AgentPool
+from AI_Component.Tasks import Tasks, format_search_results, answer_expected_output
+from AI_Component.Llms import get_llm
+from AI_Component.Tools import get_web_search
+from AI_Component.Crew import emit_task_finished
+from AI_Component.Router import model_router
+from AI_Component.Speculation import classify_speculatively
+from AI_Component.validator.validator import classify_question
+from AI_Component.validator.rules import SEAQIS
+from AI_Component.Context import RequestContext
+from AI_Component.knowledge.knowledge_base import get_knowledge_base
+from AI_Component.Events import emit
+from AI_Component.Deadline import Budget, classify_within, search_within, answer_within
+from AI_Component.FastPath import fast_answer, CREW, FAST
 from dotenv import load_dotenv
-import os
-import re
 
 load_dotenv()
-# OpenAI API Key Configuration
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 
-# Global flag for SEAQIS context
-is_seaqis_context = False
-
-# 1. Entity-based Validation Agent
-class ValidationAgent:
-    def __init__(self):
-        # Prompt Template for SEAQIS validation
-        self.validator_prompt = PromptTemplate(
-            input_variables=["question"],
-            template=(
-                "Is the following question related to SEAMEO QIS topics (quality improvement in science education, "
-                "science teaching methodologies, assessment, evaluation, curriculum development, or any other "
-                "SEAMEO QIS related topics)? Answer only with 'yes' or 'no'.\n\n"
-                "Question: {question}\n"
-            ),
-        )
-        
-        # LLM integration for validation
-        self.llm = OpenAI(model="gpt-3.5-turbo-instruct", temperature=0)
-        self.validator_chain = LLMChain(llm=self.llm, prompt=self.validator_prompt)
-    
-    def validate(self, question):
-        """Validate if the question is related to SEAMEO QIS topics"""
-        global is_seaqis_context
-        
-        response = self.validator_chain.run(question=question).strip().lower()
-        is_seaqis_context = (response == "yes")
-        
-        return is_seaqis_context
-
-# 2. Rule-based Fallback
-def rule_based_fallback(question):
-    """Apply rule-based fallback if Validation Agent cannot recognize context"""
-    global is_seaqis_context
-    
-    # If context is already set to True by the validation agent, no need for fallback
-    if is_seaqis_context:
-        return is_seaqis_context
-    
-    # Keywords that might indicate SEAQIS-related questions
-    fallback_keywords = [
-        "apa programnya", "program apa", "kegiatannya apa", "kegiatan apa", 
-        "dimana lokasinya", "lokasi", "fokusnya apa", "fokus", 
-        "apa itu SEAQIS", "apa itu QIS", "SEAMEO QIS", "QIS", "SEAQIS"
-    ]
-    
-    # Check if any of the fallback keywords are in the question
-    question_lower = question.lower()
-    for keyword in fallback_keywords:
-        if keyword.lower() in question_lower:
-            is_seaqis_context = True
-            return True
-    
-    return False
-
-# 3. Injection Context to Main Prompt
-def inject_context(question):
+# 1. Injection Context to Main Prompt
+def inject_context(question, context):
     """Inject context to the main prompt if SEAQIS context is detected"""
-    global is_seaqis_context
+    if context.is_seaqis_context:
+        return with_conversation("User is asking about SEAMEO QIS. Provide a concise and friendly explanation based on SEAQIS data. " + question, context)
     
-    if is_seaqis_context:
-        return "User is asking about SEAMEO QIS. Provide a concise and friendly explanation based on SEAQIS data. " + question
-    
-    return question
+    return with_conversation(question, context)
+
+def with_conversation(question, context):
+    """Append the rolling summary of the earlier turns of the session, if any"""
+    if context is None or not context.conversation:
+        return question
+    return f"{question}\n\nEarlier in this conversation:\n{context.conversation}"
 
-# 4. Refactored Agent Chain
+# 2. Refactored Agent Chain
 class SeaqisAgents(Agents):
-    def __init__(self):
-        super().__init__()
-    
-    def validation_agent(self):
-        """Create a validation agent for SEAQIS context detection"""
-        return Agent(
-            role="Validation Agent - SEAQIS",
-            goal="Validate if user questions are related to SEAMEO QIS topics",
-            backstory="You are an expert in identifying questions related to SEAMEO QIS topics. "
-                      "You have extensive knowledge about quality improvement in science education, "
-                      "science teaching methodologies, assessment, evaluation, and curriculum development.",
-            allow_delegation=False,
-            verbose=self.verbose,
-            llm=self.llm
-        )
+    def __init__(self, *providers):
+        super().__init__(*providers)
     
     def research_agent_seaqis(self):
         """Create a research agent specialized in SEAQIS topics"""
-        return Agent(
+        return self._agent("research_agent_seaqis",
             role="Research Agent - SEAQIS",
             goal="Research and provide comprehensive information about SEAMEO QIS topics",
             backstory="You are a specialized researcher in SEAMEO QIS topics with extensive knowledge about "
@@ -111,80 +49,170 @@ class SeaqisAgents(Agents):
             llm=self.llm
         )
 
+# Initialize global SEAQIS agent pool instance
+seaqis_agent_pool = AgentPool(SeaqisAgents)
+
 class SeaqisTasks(Tasks):
-    def __init__(self, input, lang):
-        super().__init__(input, lang)
-        self.seaqis_agents = SeaqisAgents()
-    
-    def validation_task(self):
-        """Create a task for validating if questions are related to SEAMEO QIS"""
-        return Task(
-            description=f"Your task is to validate if the following question is related to SEAMEO QIS topics: {self.input}. "
-                        "Determine if it's about quality improvement in science education, science teaching methodologies, "
-                        "assessment, evaluation, curriculum development, or any other SEAMEO QIS related topics.",
-            expected_output="A simple 'yes' or 'no' answer indicating if the question is related to SEAMEO QIS topics.",
-            agent=self.seaqis_agents.validation_agent()
-        )
+    def __init__(self, input, lang, prefetched=None, agents=None):
+        super().__init__(input, lang, prefetched, agents or SeaqisAgents())
+        self.seaqis_agents = self.agents
     
     def research_task_seaqis(self):
         """Create a research task specialized in SEAQIS topics"""
+        from crewai import Task
         return Task(
             description=f"Your task is to research and provide comprehensive information about the following SEAMEO QIS topic: {self.input}. "
                         "Focus on quality improvement in science education, science teaching methodologies, assessment, "
-                        "evaluation, curriculum development, or any other relevant SEAMEO QIS information.",
+                        "evaluation, curriculum development, or any other relevant SEAMEO QIS information." + self.search_context(),
             expected_output="Comprehensive research results about the SEAMEO QIS topic with relevant details and sources.",
             agent=self.seaqis_agents.research_agent_seaqis(),
-            tools=[WebSearch]
+            tools=[get_web_search()]
+        )
+    
+    def knowledge_answer_task(self, documents):
+        """Create an answer task grounded in local SEAQIS documents, no research needed"""
+        from crewai import Task
+        return Task(
+            description="Your task is to: "
+                        f"Answer the following question about SEAMEO QIS: {self.input}. "
+                        "Use only these SEAQIS documents:\n"
+                        f"{format_search_results(documents, max_chars=1200)}\n"
+                        "If they do not contain a detail the question asks for, say so and point to the official SEAQIS website. "
+                        "Include the reference links of the documents you used.",
+            expected_output=answer_expected_output(self.lang),
+            agent=self.seaqis_agents.general_answer()
         )
 
 class QisAgentChain:
-    def __init__(self, input, lang):
+    def __init__(self, input, lang, agents=None):
         self.input = input
         self.lang = lang
-        self.validation_agent = ValidationAgent()
-        self.tasks = SeaqisTasks(input, lang)
-        self.agents = SeaqisAgents()
+        # Prebuilt agents; without them a set is leased from seaqis_agent_pool per run
+        self.agents = agents
     
-    def process_question(self):
-        """Process the question through the SEAMEO QIS agent chain"""
-        # Step 1: Validate if the question is related to SEAMEO QIS
-        is_valid = self.validation_agent.validate(self.input)
+    def process_question(self, verdict=None, prefetched=None, context=None, speculation=None, mode=CREW):
+        """Process the question through the SEAMEO QIS agent chain
+
+        Pass the verdict from classify_question when the caller already has it,
+        so the question is not validated a second time, and the search results
+        retrieved meanwhile as prefetched (or the still running speculation).
+        Questions the local knowledge base covers are answered from it without
+        a web search. All per-question state lives in the RequestContext, so
+        one chain can serve concurrent sessions. mode="fast" answers with a
+        single model call instead of a crew (see AI_Component.FastPath).
+        """
+        if context is None:
+            context = RequestContext(self.input, self.lang)
         
-        # Step 2: Apply rule-based fallback if needed
-        if not is_valid:
-            is_valid = rule_based_fallback(self.input)
+        # Step 1: Classify the question (rules first, then a single LLM call)
+        # while the web search for a question the rules did not reject runs
+        if verdict is None:
+            verdict, speculation = classify_speculatively(
+                self.input, lambda question, use_llm=True: classify_question(question, context, use_llm))
+        context.verdict = verdict
+        is_valid = verdict == SEAQIS
         
-        # Step 3: If valid, inject context and process through the agent chain
+        # Step 2: If valid, inject context and process through the agent chain
         if is_valid:
-            # Inject context to the main prompt
-            enhanced_input = inject_context(self.input)
+            context.is_seaqis_context = True
             
-            # Create a new Tasks instance with the enhanced input
-            enhanced_tasks = SeaqisTasks(enhanced_input, self.lang)
-            
-            # Create and run the crew
-            crew = Crew(
-                tasks=[enhanced_tasks.research_task_seaqis(), enhanced_tasks.general_answer_task()],
-                agents=[self.agents.research_agent_seaqis(), self.agents.general_answer()],
-                process=Process.sequential,
-                manager_llm=openai
-            )
-            
-            return crew.kickoff()
+            # Step 3: Answer from local SEAQIS documents when they cover the question
+            documents, sufficient = get_knowledge_base().retrieve(self.input)
+            if sufficient:
+                if speculation is not None:
+                    speculation.discard()
+            elif prefetched is None and speculation is not None:
+                prefetched = speculation.results()
+            return self.answer(context, documents, sufficient, prefetched, mode)
         
+        # The search started for a question this chain does not answer only uses quota
+        if speculation is not None:
+            speculation.discard()
         # If not valid, return None to indicate that the question is not related to SEAMEO QIS
         return None
+    
+    async def aprocess_question(self, budget=None, verdict=None, context=None, speculation=None, late=None, mode=CREW):
+        """process_question within a latency budget (see AI_Component.Deadline)
 
-# Function to check if a question is related to SEAMEO QIS
-def is_seaqis_question(question):
-    """Check if a question is related to SEAMEO QIS using the validation agent and fallback rules"""
-    validation_agent = ValidationAgent()
+        Classification, the web search and the answer each get a slice of the
+        budget. A search that overruns leaves the research with the results
+        that arrived; an answer that overruns returns the text written so far
+        with a notice and sets context.partial. context.budget_report records
+        how each stage used its slice; late receives the complete answer.
+        """
+        budget = budget or Budget()
+        if context is None:
+            context = RequestContext(self.input, self.lang)
+        
+        with budget.applied():
+            try:
+                if verdict is None:
+                    verdict, speculation = await classify_within(
+                        budget, self.input, lambda question, use_llm=True: classify_question(question, context, use_llm))
+                context.verdict = verdict
+                if verdict != SEAQIS:
+                    if speculation is not None:
+                        speculation.discard()
+                    return None
+                context.is_seaqis_context = True
+                
+                documents, sufficient = get_knowledge_base().retrieve(self.input)
+                prefetched = None
+                if sufficient:
+                    if speculation is not None:
+                        speculation.discard()
+                else:
+                    prefetched = await search_within(budget, speculation)
+                run = lambda: self.answer(context, documents, sufficient, prefetched, mode)
+                return await answer_within(budget, context, run, documents if sufficient else prefetched, late, self.lang)
+            finally:
+                context.budget_report = budget.report()
     
-    # Step 1: Validate using the validation agent
-    is_valid = validation_agent.validate(question)
+    def answer(self, context, documents, sufficient, prefetched, mode=CREW):
+        """Run the knowledge crew (sufficient documents) or the research crew for a valid question"""
+        # Inject context to the main prompt
+        enhanced_input = inject_context(self.input, context)
+        if sufficient:
+            emit("knowledge_hit", documents=len(documents))
+        if mode == FAST:
+            # One answer call on the documents, or on the web search for the question
+            return fast_answer(enhanced_input, self.lang, documents if sufficient else prefetched, self.input)
+        if sufficient:
+            run = lambda agents: self.run_knowledge_crew(enhanced_input, documents, agents)
+        else:
+            run = lambda agents: self.run_crew(enhanced_input, prefetched, agents)
+        
+        if self.agents is not None:
+            return run(self.agents)
+        
+        def attempt(search_tier, answer_tier):
+            with seaqis_agent_pool.lease(search_tier, answer_tier) as agents:
+                return run(agents)
+        
+        # Cheap tiers research, the answer tier follows the question difficulty
+        return model_router.run_crew(self.input, attempt, searches=not sufficient)
     
-    # Step 2: Apply rule-based fallback if needed
-    if not is_valid:
-        is_valid = rule_based_fallback(question)
+    def run_crew(self, enhanced_input, prefetched, agents):
+        """Bind the enhanced input to tasks on prebuilt agents and run the crew"""
+        from crewai import Crew, Process
+        tasks = SeaqisTasks(enhanced_input, self.lang, prefetched, agents)
+        crew = Crew(
+            tasks=[tasks.research_task_seaqis(), tasks.general_answer_task()],
+            agents=[agents.research_agent_seaqis(), agents.general_answer()],
+            process=Process.sequential,
+            manager_llm=get_llm("openai"),
+            task_callback=emit_task_finished
+        )
+        return crew.kickoff()
     
-    return is_valid
\ No newline at end of file
+    def run_knowledge_crew(self, enhanced_input, documents, agents):
+        """Answer-only crew grounded in local documents: one agent, no web search"""
+        from crewai import Crew, Process
+        tasks = SeaqisTasks(enhanced_input, self.lang, agents=agents)
+        crew = Crew(
+            tasks=[tasks.knowledge_answer_task(documents)],
+            agents=[agents.general_answer()],
+            process=Process.sequential,
+            task_callback=emit_task_finished
+        )
+        return crew.kickoff()
@@ -0,0 +1,191 @@
+import argparse
+import ast
+import json
+import math
+import os
+import random
+import threading
+import zlib
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+QUESTIONS_PATH = os.path.join(DATA_DIR, "questions.jsonl")
+MODEL_PATH = os.path.join(DATA_DIR, "intent_model.json")
+TEST_VALIDATOR_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "test_validator.py")
+
+# Questions below this confidence are escalated to the LLM
+DEFAULT_THRESHOLD = float(os.getenv("QIS_LOCAL_CLASSIFIER_THRESHOLD", "0.85"))
+# A wrong reject is never seen by the LLM, so by default the local model only
+# accepts and every reject it predicts is escalated ("inf")
+REJECT_THRESHOLD = float(os.getenv("QIS_LOCAL_CLASSIFIER_REJECT_THRESHOLD", "inf"))
+REJECT = "reject"
+
+def extract_features(question, n_min=2, n_max=4, buckets=2 ** 18):
+    """Hash the character n-grams of a question into sparse feature indices"""
+    text = " " + " ".join(question.lower().split()) + " "
+    features = {}
+    for n in range(n_min, n_max + 1):
+        for i in range(len(text) - n + 1):
+            index = zlib.crc32(text[i:i + n].encode("utf-8")) % buckets
+            features[index] = features.get(index, 0.0) + 1.0
+    # L2 normalization keeps long and short questions on the same scale
+    norm = math.sqrt(sum(value * value for value in features.values())) or 1.0
+    return {index: value / norm for index, value in features.items()}
+
+def load_labelled_questions(path=QUESTIONS_PATH):
+    """Read (question, label) pairs from a JSONL file"""
+    pairs = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                pairs.append((record["question"], record["label"]))
+    return pairs
+
+def load_test_validator_cases(path=TEST_VALIDATOR_PATH):
+    """Read the labelled_cases list from test_validator.py without running the script"""
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "labelled_cases" for target in node.targets):
+            return [tuple(case) for case in ast.literal_eval(node.value)]
+    return []
+
+class LocalIntentClassifier:
+    """Multinomial logistic regression over hashed character n-grams"""
+
+    def __init__(self, labels, weights, bias, n_min=2, n_max=4, buckets=2 ** 18, threshold=DEFAULT_THRESHOLD,
+                 reject_threshold=REJECT_THRESHOLD):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+        self.n_min = n_min
+        self.n_max = n_max
+        self.buckets = buckets
+        self.threshold = threshold
+        self.reject_threshold = reject_threshold
+        self.decided = 0
+        self.escalated = 0
+        self._stats_lock = threading.Lock()
+
+    def _probabilities(self, features):
+        scores = []
+        for label in self.labels:
+            label_weights = self.weights[label]
+            score = self.bias[label]
+            for index, value in features.items():
+                score += label_weights.get(index, 0.0) * value
+            scores.append(score)
+        top = max(scores)
+        exp_scores = [math.exp(score - top) for score in scores]
+        total = sum(exp_scores)
+        return [score / total for score in exp_scores]
+
+    def predict(self, question):
+        """Return (label, confidence) for the question"""
+        features = extract_features(question, self.n_min, self.n_max, self.buckets)
+        probabilities = self._probabilities(features)
+        best = max(range(len(self.labels)), key=probabilities.__getitem__)
+        return self.labels[best], probabilities[best]
+
+    def decide(self, question):
+        """Return the label when confident enough, or None to escalate to the LLM"""
+        label, confidence = self.predict(question)
+        threshold = self.reject_threshold if label == REJECT else self.threshold
+        with self._stats_lock:
+            if confidence >= threshold:
+                self.decided += 1
+                return label
+            self.escalated += 1
+        return None
+
+    def stats(self):
+        """Escalation counters used to tune the confidence threshold"""
+        with self._stats_lock:
+            total = self.decided + self.escalated
+            return {
+                "threshold": self.threshold,
+                "reject_threshold": self.reject_threshold,
+                "decided": self.decided,
+                "escalated": self.escalated,
+                "escalation_rate": self.escalated / total if total else 0.0,
+            }
+
+    @classmethod
+    def train(cls, pairs, epochs=30, learning_rate=0.5, l2=1e-4, n_min=2, n_max=4, buckets=2 ** 18, seed=13):
+        """Fit the model with plain SGD; the data set is small enough for pure Python"""
+        labels = sorted({label for _, label in pairs})
+        weights = {label: {} for label in labels}
+        bias = {label: 0.0 for label in labels}
+        samples = [(extract_features(question, n_min, n_max, buckets), label) for question, label in pairs]
+        model = cls(labels, weights, bias, n_min, n_max, buckets)
+        rng = random.Random(seed)
+
+        for _ in range(epochs):
+            rng.shuffle(samples)
+            for features, target in samples:
+                probabilities = model._probabilities(features)
+                for label, probability in zip(labels, probabilities):
+                    gradient = probability - (1.0 if label == target else 0.0)
+                    label_weights = weights[label]
+                    for index, value in features.items():
+                        current = label_weights.get(index, 0.0)
+                        label_weights[index] = current - learning_rate * (gradient * value + l2 * current)
+                    bias[label] -= learning_rate * gradient
+        return model
+
+    def save(self, path=MODEL_PATH):
+        model = {
+            "labels": self.labels,
+            "n_min": self.n_min,
+            "n_max": self.n_max,
+            "buckets": self.buckets,
+            "bias": self.bias,
+            "weights": {
+                label: {str(index): round(value, 6) for index, value in label_weights.items() if abs(value) > 1e-6}
+                for label, label_weights in self.weights.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(model, file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path=MODEL_PATH, threshold=DEFAULT_THRESHOLD, reject_threshold=REJECT_THRESHOLD):
+        with open(path, encoding="utf-8") as file:
+            model = json.load(file)
+        weights = {
+            label: {int(index): value for index, value in label_weights.items()}
+            for label, label_weights in model["weights"].items()
+        }
+        return cls(model["labels"], weights, model["bias"], model["n_min"], model["n_max"], model["buckets"],
+                   threshold, reject_threshold)
+
+_instance = None
+_instance_lock = threading.Lock()
+
+def get_local_classifier():
+    """Load the serialized model once per process, or None when it is missing"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None and os.path.exists(MODEL_PATH):
+                _instance = LocalIntentClassifier.load()
+    return _instance
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local intent classifier")
+    parser.add_argument("files", nargs="*", help="extra labelled JSONL files")
+    parser.add_argument("--with-test-cases", action="store_true", help="also train on labelled_cases from test_validator.py")
+    parser.add_argument("--output", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    pairs = load_labelled_questions()
+    for path in args.files:
+        pairs += load_labelled_questions(path)
+    if args.with_test_cases:
+        pairs += load_test_validator_cases()
+
+    model = LocalIntentClassifier.train(pairs)
+    model.save(args.output)
+    correct = sum(model.predict(question)[0] == label for question, label in pairs)
+    print(f"Trained on {len(pairs)} questions, training accuracy {correct / len(pairs):.2%}, saved to {args.output}")
@@ -0,0 +1,139 @@
+import re
+from collections import namedtuple
+
+# Verdicts returned by the classification stage
+SCIENCE = "science"
+SEAQIS = "seaqis"
+REJECT = "reject"
+
+# Patterns that identify questions about the SEAMEO QIS organization itself
+SEAQIS_PATTERNS = [
+    r'qis\b',
+    r'seaqis\b',
+    r'seameo\b',
+    r'kegiatan\s+apa\s+aja',
+    r'program(nya)?\s+apa',
+    r'lokasi(nya)?\s+di\s+mana',
+    r'tujuan(nya)?\s+apa',
+    r'fokus(nya)?\s+ke\s+mana',
+    r'apa\s+itu\s+(seameo|qis|seaqis)',
+    r'what\s+is\s+(seameo|qis|seaqis)',
+    r'what\s+are\s+the\s+activities\s+of\s+(seameo|qis|seaqis)',
+    r'what\s+programs\s+(does|of)\s+(seameo|qis|seaqis)',
+    r'where\s+is\s+(seameo|qis|seaqis)\s+located',
+    r'what\s+is\s+the\s+purpose\s+of\s+(seameo|qis|seaqis)',
+    r'what\s+is\s+the\s+focus\s+of\s+(seameo|qis|seaqis)',
+]
+
+# Plain keywords used by the SEAQIS agent chain fallback (substring match)
+SEAQIS_KEYWORDS = [
+    "apa programnya", "program apa", "kegiatannya apa", "kegiatan apa",
+    "dimana lokasinya", "lokasi", "fokusnya apa", "fokus",
+    "apa itu SEAQIS", "apa itu QIS", "SEAMEO QIS", "QIS", "SEAQIS"
+]
+
+# Education-specific patterns with context
+SCIENCE_PATTERNS = [
+    r'science\s+(education|teaching|learning|curriculum)',
+    r'stem\s+(education|teaching|learning|curriculum)',
+    r'(teaching|learning)\s+science',
+    r'(teaching|learning)\s+stem',
+    r'curriculum\s+development\s+for\s+science',
+    r'assessment\s+(in|for)\s+science',
+    r'evaluation\s+(in|for)\s+science',
+    r'quality\s+improvement\s+in\s+science'
+]
+
+RuleMatch = namedtuple("RuleMatch", ["label", "rule", "text"])
+
+def keyword_trie_pattern(keywords):
+    """Build one regex from plain keywords by factoring their common prefixes
+
+    The alternation of a trie costs one branch per character instead of one
+    branch per keyword, so lookups stay flat as the keyword list grows.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        ends = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not ends:
+            return branches[0]
+        pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if ends else pattern
+
+    return build(trie)
+
+class RuleEngine:
+    """Match questions against all rules with one compiled regex per label"""
+
+    def __init__(self):
+        self._rules = {}
+        self._compiled = None
+
+    def add_patterns(self, label, patterns):
+        self._rules.setdefault(label, ([], []))[0].extend(patterns)
+        self._compiled = None
+        return self
+
+    def add_keywords(self, label, keywords):
+        self._rules.setdefault(label, ([], []))[1].extend(keywords)
+        self._compiled = None
+        return self
+
+    def compile(self):
+        """Compile each label's rules into a single alternation
+
+        The alternation is non-capturing because named groups per rule disable
+        the regex engine's prefix optimizations; the matching rule is looked up
+        only after a hit, at the position where the alternation matched.
+        """
+        compiled = []
+        for label, (patterns, keywords) in self._rules.items():
+            branches = [f"(?:{pattern})" for pattern in patterns]
+            lowered = {keyword.lower(): keyword for keyword in keywords}
+            if lowered:
+                branches.append(keyword_trie_pattern(lowered))
+            if branches:
+                rules = [(pattern, re.compile(pattern)) for pattern in patterns]
+                compiled.append((label, re.compile("|".join(branches)), rules, lowered))
+        self._compiled = compiled
+        return self
+
+    def match(self, question, label=None):
+        """Return the first RuleMatch in label priority order, or None"""
+        if self._compiled is None:
+            self.compile()
+        question_lower = question.lower()
+        for rule_label, regex, rules, keywords in self._compiled:
+            if label is not None and rule_label != label:
+                continue
+            found = regex.search(question_lower)
+            if found is None:
+                continue
+            text = found.group()
+            rule = keywords.get(text)
+            if rule is None:
+                start = found.start()
+                rule = next((pattern for pattern, single in rules if single.match(question_lower, start)), text)
+            return RuleMatch(rule_label, rule, text)
+        return None
+
+    def size(self):
+        return sum(len(patterns) + len(keywords) for patterns, keywords in self._rules.values())
+
+# Shared engine used by QisValidator and the SEAQIS agent chain, compiled at import
+question_rules = (
+    RuleEngine()
+    .add_patterns(SEAQIS, SEAQIS_PATTERNS)
+    .add_keywords(SEAQIS, SEAQIS_KEYWORDS)
+    .add_patterns(SCIENCE, SCIENCE_PATTERNS)
+    .compile()
+)
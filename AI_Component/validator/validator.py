@@ -1,109 +1,123 @@
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import OpenAI
+from AI_Component.Text import normalize_question
+from AI_Component.Router import model_router
+from AI_Component.Tracing import span
+from AI_Component.validator.local_classifier import get_local_classifier
+from AI_Component.validator.rules import question_rules, SCIENCE, SEAQIS, REJECT
+from collections import OrderedDict
 from dotenv import load_dotenv
-import os
-import re
+import threading
 
 load_dotenv()
-# OpenAI API Key Configuration
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+
+VALIDATOR_TEMPLATE = (
+    "You are a validation agent for SEAMEO QIS topics. "
+    "Classify the following question into exactly one label:\n"
+    "SEAQIS - the question is about the SEAMEO QIS organization itself "
+    "(its programs, activities, location, purpose or focus).\n"
+    "SCIENCE - the question is related to quality improvement in science education, "
+    "science teaching methodologies, assessment, evaluation, curriculum development, "
+    "STEM education or science concepts. Be generous in interpretation.\n"
+    "REJECT - anything else.\n\n"
+    "Question: {question}\n\n"
+    "Answer only with 'SEAQIS', 'SCIENCE' or 'REJECT'."
+)
 
 # Enhanced SEAMEO QIS Validator with Entity-based Detection
 class QisValidator:
-    def __init__(self):
-        self.llm = OpenAI(model="gpt-3.5-turbo-instruct", temperature=0)
-        self.is_qis_context = False
-        self.fallback_active = False
-        
-        # Enhanced prompt for better context detection
-        self.validator_prompt = PromptTemplate(
-            input_variables=["question"],
-            template=(
-                "You are a validation agent for SEAMEO QIS topics. "
-                "Determine if the following question is related to SEAMEO QIS's scope: "
-                "quality improvement in science education, science teaching methodologies, "
-                "assessment, evaluation, curriculum development, STEM education, "
-                "or SEAMEO QIS organization itself.\n\n"
-                "Be generous in interpretation - if it's remotely related to science education, "
-                "STEM teaching, or educational improvement, consider it valid.\n\n"
-                "Question: {question}\n\n"
-                "Answer only with 'QIS_CONTEXT' if related, 'NOT_QIS' if not related."
-            ),
-        )
+    def __init__(self, memo_size=1024, router=model_router):
+        # The validation tiers (a small, fast model first) come from the model router
+        self.router = router
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        # Offline classifier that settles confident cases without a network call
+        self.local_classifier = get_local_classifier()
+    
+    def llm_verdict(self, question):
+        """Ask the model for a verdict with a single call"""
+        # Single prompt that decides both the scope and the pipeline path
+        response, _ = self.router.invoke("validation", VALIDATOR_TEMPLATE.format(question=question))
+        response = response.strip().upper()
         
-        # Create a chain using the newer LangChain approach
-        self.validator_chain = self.validator_prompt | self.llm | StrOutputParser()
+        if "SEAQIS" in response:
+            return SEAQIS
+        if "SCIENCE" in response:
+            return SCIENCE
+        return REJECT
+    
+    def classify(self, question, context=None, use_llm=True):
+        """Return one verdict (science, seaqis or reject) for the question
+
+        The validator itself holds no per-question state; how the verdict was
+        reached is recorded on the optional RequestContext. With use_llm False
+        only the memo, the rules and the local classifier are consulted, and
+        None means the model has to decide.
+        """
+        with span("classification") as current:
+            verdict, rule, source = self._classify(question, current, use_llm)
+            current.set(verdict=verdict, source=source, cache_hit=source == "memo")
+        if verdict is None:
+            return None
+        if context is not None:
+            context.verdict = verdict
+            context.is_seaqis_context = verdict == SEAQIS
+            context.fallback_active = rule is not None
+            context.matched_rule = rule
+        return verdict
     
-    def rule_based_fallback(self, question):
-        """Rule-based fallback for common question patterns"""
-        # More specific fallback patterns to avoid false positives
-        fallback_patterns = [
-            # Organization-specific patterns
-            r'qis\b',
-            r'seaqis\b',
-            r'seameo\b',
-            
-            # Question patterns about the organization
-            r'kegiatan\s+apa\s+aja',
-            r'program(nya)?\s+apa',
-            r'lokasi(nya)?\s+di\s+mana',
-            r'tujuan(nya)?\s+apa',
-            r'fokus(nya)?\s+ke\s+mana',
-            r'apa\s+itu\s+(seameo|qis|seaqis)',
-            r'what\s+is\s+(seameo|qis|seaqis)',
-            r'what\s+are\s+the\s+activities\s+of\s+(seameo|qis|seaqis)',
-            r'what\s+programs\s+(does|of)\s+(seameo|qis|seaqis)',
-            r'where\s+is\s+(seameo|qis|seaqis)\s+located',
-            r'what\s+is\s+the\s+purpose\s+of\s+(seameo|qis|seaqis)',
-            r'what\s+is\s+the\s+focus\s+of\s+(seameo|qis|seaqis)',
-            
-            # Education-specific patterns with context
-            r'science\s+(education|teaching|learning|curriculum)',
-            r'stem\s+(education|teaching|learning|curriculum)',
-            r'(teaching|learning)\s+science',
-            r'(teaching|learning)\s+stem',
-            r'curriculum\s+development\s+for\s+science',
-            r'assessment\s+(in|for)\s+science',
-            r'evaluation\s+(in|for)\s+science',
-            r'quality\s+improvement\s+in\s+science'
-        ]
+    def _classify(self, question, current, use_llm=True):
+        """Return (verdict, matched rule, source) where source is memo, rules, local, llm or deferred"""
+        key = normalize_question(question)
+        with self._memo_lock:
+            memo = self._memo.get(key)
+            if memo is not None:
+                self._memo.move_to_end(key)
+                return (*memo, "memo")
+        
+        # Rules first, then the local classifier, the model is only asked for uncertain cases
+        with span("rule_fallback") as rules:
+            match = question_rules.match(question)
+            rules.set(rule=match.rule if match else None)
+        rule = match.rule if match else None
+        verdict = match.label if match else None
+        source = "rules"
+        if verdict is None and self.local_classifier is not None:
+            verdict = self.local_classifier.decide(question)
+            source = "local"
         
-        question_lower = question.lower()
+        if verdict is None and not use_llm:
+            return None, rule, "deferred"
         
-        for pattern in fallback_patterns:
-            if re.search(pattern, question_lower):
-                self.fallback_active = True
-                return True
-                
-        return False
+        failed = False
+        if verdict is None:
+            source = "llm"
+            try:
+                verdict = self.llm_verdict(question)
+            except Exception as e:
+                # Emergency fallback - the rules already failed, so do not memoize;
+                # the classification span logs the error
+                current.fail(e)
+                verdict, failed = REJECT, True
+        
+        if not failed:
+            with self._memo_lock:
+                self._memo[key] = (verdict, rule)
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return verdict, rule, source
     
-    def validate(self, question):
+    def validate(self, question, context=None):
         """Main validation function with entity detection and fallback"""
-        try:
-            # Primary validation through LLM using the newer invoke approach
-            response = self.validator_chain.invoke({"question": question}).strip().upper()
-            
-            if "QIS_CONTEXT" in response:
-                self.is_qis_context = True
-                return True
-            
-            # Fallback to rule-based detection
-            if self.rule_based_fallback(question):
-                self.is_qis_context = True
-                return True
-                
-            return False
-            
-        except Exception as e:
-            # Emergency fallback - if anything fails, use rule-based only
-            print(f"Validation error: {e}")
-            return self.rule_based_fallback(question)
+        return self.classify(question, context) != REJECT
 
 # Initialize global validator instance
 qis_validator_instance = QisValidator()
 
+def classify_question(question, context=None, use_llm=True):
+    """Classify a question into science, seaqis or reject with at most one LLM call (None without use_llm)"""
+    return qis_validator_instance.classify(question, context, use_llm)
+
 # Legacy function for backward compatibility
-def qis_validator(question):
+def qis_validator(question, context=None):
     """Legacy validator function - now uses enhanced QisValidator"""
-    return qis_validator_instance.validate(question)
+    return qis_validator_instance.validate(question, context)
@@ -0,0 +1,42 @@
+import json
+import os
+import requests
+
+# Jika diisi, UI Streamlit hanya menjadi thin client dari api.py
+API_URL = os.getenv("QIS_API_URL", "")
+# Token bersama dengan api.py, agar API mempercayai X-Client-Id per pengguna UI
+API_CLIENT_TOKEN = os.getenv("QIS_API_CLIENT_TOKEN", "")
+
+# Fungsi untuk membaca stream server-sent events dari API
+def stream_answer_remote(question, lang, api_url=API_URL, timeout=300, mode=None, session=None, client=None):
+    """Yield the same (kind, data) events as Pipeline.stream_answer, from the HTTP API
+
+    client is a stable id of the browser session, so the API's per-client
+    limit applies per user rather than to the whole UI.
+    """
+    headers = {}
+    if client and API_CLIENT_TOKEN:
+        headers = {"X-Client-Id": client, "X-Client-Token": API_CLIENT_TOKEN}
+    response = requests.post(
+        f"{api_url.rstrip('/')}/v1/answer/stream",
+        json={"question": question, "lang": lang, "mode": mode, "session": session},
+        headers=headers,
+        stream=True,
+        timeout=timeout,
+    )
+    if response.status_code in (429, 503):
+        yield "error", {"error": RuntimeError("SciMentor sedang sibuk, silakan coba lagi sebentar lagi.")}
+        return
+    response.raise_for_status()
+    
+    kind = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            kind = line[len("event: "):]
+        elif line.startswith("data: ") and kind:
+            data = json.loads(line[len("data: "):])
+            if kind == "error":
+                data = {"error": RuntimeError(data["error"])}
+            yield kind, data
+            if kind in ("done", "error"):
+                return
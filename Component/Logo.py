@@ -1,6 +1,17 @@
 import base64
+import io
+import os
+import threading
 import streamlit as st
 
+# Logo dipakai dengan tinggi 120px (lihat .Logo), disimpan 2x untuk layar HiDPI
+LOGO_HEIGHT = 120
+LOGO_PIXEL_RATIO = 2
+
+# Cache HTML header per proses, key: daftar file beserta mtime dan ukurannya
+_fragment_cache = {}
+_fragment_lock = threading.Lock()
+
 # Fungsi untuk mengatur page config (favicon dan title)
 def set_page_config(page_title="SEAMEO QIS AI", page_icon="./Image/qis", layout="wide"):
     st.set_page_config(
@@ -17,8 +28,53 @@ def get_base64_of_bin_file(bin_file):
         base64_data = base64.b64encode(binary_data).decode('utf-8')
     return base64_data
 
-# Fungsi untuk menampilkan gambar dengan penyesuaian jumlah card
-def image(file_paths):
+# Fungsi untuk mengecilkan logo ke ukuran tampil dan memilih encoding terkecil
+def encode_logo(file_path, height=LOGO_HEIGHT * LOGO_PIXEL_RATIO):
+    """Return (mime type, base64 data) of the logo resized to its display height"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return "image/png", get_base64_of_bin_file(file_path)
+    
+    with Image.open(file_path) as source:
+        logo = source.convert("RGBA")
+    if logo.height > height:
+        logo = logo.resize((max(1, round(logo.width * height / logo.height)), height), Image.LANCZOS)
+    
+    candidates = []
+    for mime, save_options in (("image/webp", {"format": "WEBP", "quality": 85, "method": 6}),
+                               ("image/png", {"format": "PNG", "optimize": True})):
+        buffer = io.BytesIO()
+        try:
+            logo.save(buffer, **save_options)
+        except (OSError, KeyError, ValueError):
+            continue
+        candidates.append((len(buffer.getvalue()), mime, buffer.getvalue()))
+    if not candidates:
+        return "image/png", get_base64_of_bin_file(file_path)
+    _, mime, data = min(candidates)
+    return mime, base64.b64encode(data).decode('utf-8')
+
+def _fragment_key(file_paths):
+    key = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        key.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(key)
+
+# Fungsi untuk menyusun HTML header sekali per proses (bukan setiap rerun)
+def logo_html(file_paths):
+    key = _fragment_key(file_paths)
+    fragment = _fragment_cache.get(key)
+    if fragment is None:
+        with _fragment_lock:
+            fragment = _fragment_cache.get(key)
+            if fragment is None:
+                fragment = build_logo_html(file_paths)
+                _fragment_cache[key] = fragment
+    return fragment
+
+def build_logo_html(file_paths):
     style_block = f"""
         <style>
         .LogoContainer {{
@@ -57,11 +113,14 @@ def image(file_paths):
     
     # Menambahkan setiap gambar
     for file_path in file_paths:
-        image_base64 = get_base64_of_bin_file(file_path)
-        style_block += f"""<img src="data:image/png;base64,{image_base64}" class="Logo">"""
+        mime, image_base64 = encode_logo(file_path)
+        style_block += f"""<img src="data:{mime};base64,{image_base64}" class="Logo">"""
     
     style_block += "</div>"
-    
+    return style_block
+
+# Fungsi untuk menampilkan gambar dengan penyesuaian jumlah card
+def image(file_paths):
     # Render di Streamlit
-    st.markdown(style_block, unsafe_allow_html=True)
+    st.markdown(logo_html(file_paths), unsafe_allow_html=True)
     
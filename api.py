@@ -0,0 +1,236 @@
+"""Headless HTTP/JSON API for the SciMentor answer pipeline
+
+    POST /v1/answer          {"question": "...", "lang": "english", "budget": 20, "mode": "fast"} -> JSON answer
+    POST /v1/answer/stream   same body -> server-sent events (stage, token, done)
+    GET  /healthz            queue depth, worker status and provider rate limits
+    GET  /metrics            Prometheus metrics: stage latency histograms, tokens, cache hits
+
+Requests go through a bounded job queue served by a fixed number of workers.
+A client over its concurrency limit gets 429. Clients are told apart by their
+remote address; a trusted hop such as the Streamlit UI, which sends the
+shared QIS_API_CLIENT_TOKEN in X-Client-Token, names its own users with
+X-Client-Id (one id per browser session). Without the token X-Client-Id is
+ignored, so a caller cannot pick its own limit bucket. When the queue is full
+the request gets 503 with Retry-After. "budget" (seconds, default
+QIS_LATENCY_BUDGET, 0 for none) bounds the request end to end; an
+answer cut at the deadline comes back with "partial": true. "mode" is "crew"
+or "fast" (a single answer call, default QIS_EXECUTION_MODE). Requests with
+the same "session" id are one conversation: follow-up questions reuse the
+evidence and context of the earlier ones (see AI_Component.Session; the
+sessions live in this replica's memory).
+
+    python api.py
+"""
+from aiohttp import web
+from concurrent.futures import ThreadPoolExecutor
+from AI_Component.Pipeline import answer_question, aanswer_question, stream_collector, pipeline_flight
+from AI_Component.Context import RequestContext
+from AI_Component.Events import listen
+from AI_Component.Tracing import metrics
+from AI_Component.Deadline import LATENCY_BUDGET
+from AI_Component.RateLimit import rate_limiter
+from AI_Component.FastPath import execution_mode
+from AI_Component.Session import SessionStore
+import asyncio
+import hmac
+import json
+import os
+
+API_HOST = os.getenv("QIS_API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("QIS_API_PORT", "8080"))
+API_WORKERS = int(os.getenv("QIS_API_WORKERS", "4"))
+API_QUEUE_SIZE = int(os.getenv("QIS_API_QUEUE_SIZE", "32"))
+API_PER_CLIENT = int(os.getenv("QIS_API_PER_CLIENT", "2"))
+API_RETRY_AFTER = int(os.getenv("QIS_API_RETRY_AFTER", "5"))
+# Shared with the UI; requests that carry it may name their client with X-Client-Id
+API_CLIENT_TOKEN = os.getenv("QIS_API_CLIENT_TOKEN", "")
+
+# Conversations of the clients that send a "session" id
+sessions = SessionStore()
+
+class Saturated(Exception):
+    """The job queue is full"""
+
+class ClientLimit(Exception):
+    """The client already has its maximum number of jobs queued or running"""
+
+class JobQueue:
+    """Bounded queue of pipeline jobs, served by a fixed pool of worker threads"""
+
+    def __init__(self, workers=API_WORKERS, size=API_QUEUE_SIZE, per_client=API_PER_CLIENT):
+        self.workers = workers
+        self.per_client = per_client
+        self.queue = asyncio.Queue(maxsize=size)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qis-api")
+        self.running = 0
+        self.in_flight = {}
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, client, job):
+        """Queue job (a blocking callable) and return a future of its result"""
+        if self.in_flight.get(client, 0) >= self.per_client:
+            raise ClientLimit()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((client, job, future))
+        except asyncio.QueueFull:
+            raise Saturated()
+        self.in_flight[client] = self.in_flight.get(client, 0) + 1
+        return future
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            client, job, future = await self.queue.get()
+            self.running += 1
+            try:
+                result = await loop.run_in_executor(self.executor, job)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            finally:
+                self.running -= 1
+                self.in_flight[client] -= 1
+                if not self.in_flight[client]:
+                    del self.in_flight[client]
+                self.queue.task_done()
+
+    def stats(self):
+        return {"queued": self.queue.qsize(), "running": self.running, "workers": self.workers,
+                "queue_size": self.queue.maxsize, "clients": len(self.in_flight)}
+
+def client_id(request):
+    forwarded = request.headers.get("X-Client-Id")
+    token = request.headers.get("X-Client-Token", "")
+    if forwarded and API_CLIENT_TOKEN and hmac.compare_digest(token, API_CLIENT_TOKEN):
+        return f"trusted:{forwarded}"
+    return request.remote or "anonymous"
+
+async def read_question(request):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "body must be JSON"}), content_type="application/json")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "body must be a JSON object"}), content_type="application/json")
+    question = body.get("question") or ""
+    if not isinstance(question, str) or not question.strip():
+        raise web.HTTPBadRequest(text=json.dumps({"error": "question is required"}), content_type="application/json")
+    question = question.strip()
+    lang = body.get("lang") or "english"
+    if not isinstance(lang, str):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "lang must be a string"}), content_type="application/json")
+    budget = body.get("budget")
+    # bool is an int subclass, but "budget": true is not a number of seconds
+    if budget is not None and (isinstance(budget, bool) or not isinstance(budget, (int, float)) or budget < 0):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "budget must be a number of seconds"}), content_type="application/json")
+    try:
+        mode = execution_mode(body.get("mode"))
+    except (ValueError, AttributeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "mode must be \"crew\" or \"fast\""}), content_type="application/json")
+    session_id = body.get("session")
+    if session_id is not None and not isinstance(session_id, str):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "session must be a string id"}), content_type="application/json")
+    return question, lang, budget, mode, sessions.get(session_id)
+
+def pipeline_job(question, lang, budget, mode, context, session=None):
+    """Blocking job for the queue; with a budget the answer may be partial (see AI_Component.Deadline)"""
+    if budget is None:
+        budget = LATENCY_BUDGET
+    if budget:
+        return asyncio.run(aanswer_question(question, lang, budget, context=context, mode=mode, session=session))
+    return answer_question(question, lang, context=context, mode=mode, session=session)
+
+def backpressure(error):
+    if isinstance(error, ClientLimit):
+        return web.json_response({"error": "too many concurrent requests for this client"}, status=429,
+                                 headers={"Retry-After": str(API_RETRY_AFTER)})
+    return web.json_response({"error": "server is saturated, retry later"}, status=503,
+                             headers={"Retry-After": str(API_RETRY_AFTER)})
+
+async def answer(request):
+    question, lang, budget, mode, session = await read_question(request)
+    context = RequestContext(question, lang)
+    try:
+        future = request.app["jobs"].submit(client_id(request),
+                                            lambda: pipeline_job(question, lang, budget, mode, context, session))
+    except (ClientLimit, Saturated) as error:
+        return backpressure(error)
+    result = await future
+    return web.json_response({"question": question, "lang": lang, "mode": mode, "verdict": context.verdict,
+                              "rejected": result is None, "answer": result,
+                              "partial": context.partial, "budget": context.budget_report})
+
+async def answer_stream(request):
+    question, lang, budget, mode, session = await read_question(request)
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    collect = stream_collector(lambda kind, data: loop.call_soon_threadsafe(events.put_nowait, (kind, data)), lang)
+    context = RequestContext(question, lang)
+
+    def job():
+        with listen(collect):
+            return pipeline_job(question, lang, budget, mode, context, session)
+
+    try:
+        future = request.app["jobs"].submit(client_id(request), job)
+    except (ClientLimit, Saturated) as error:
+        return backpressure(error)
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    future.add_done_callback(lambda _: events.put_nowait(("finished", {})))
+    while True:
+        kind, data = await events.get()
+        if kind == "finished":
+            break
+        await response.write(f"event: {kind}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8"))
+
+    if future.exception() is not None:
+        final = ("error", {"error": str(future.exception())})
+    else:
+        final = ("done", {"verdict": context.verdict, "mode": mode, "answer": future.result(),
+                          "partial": context.partial, "budget": context.budget_report})
+    await response.write(f"event: {final[0]}\ndata: {json.dumps(final[1])}\n\n".encode("utf-8"))
+    await response.write_eof()
+    return response
+
+async def health(request):
+    return web.json_response({**request.app["jobs"].stats(), "single_flight": pipeline_flight.stats(),
+                              "rate_limits": rate_limiter.stats()})
+
+async def metrics_endpoint(request):
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+async def start_jobs(app):
+    app["jobs"] = JobQueue()
+    app["jobs"].start()
+    jobs = app["jobs"]
+    metrics.gauge("qis_api_jobs", "Jobs of the API queue by state",
+                  lambda: {(("state", "queued"),): jobs.queue.qsize(), (("state", "running"),): jobs.running})
+
+async def stop_jobs(app):
+    await app["jobs"].stop()
+
+def create_app():
+    app = web.Application()
+    app.on_startup.append(start_jobs)
+    app.on_cleanup.append(stop_jobs)
+    app.router.add_post("/v1/answer", answer)
+    app.router.add_post("/v1/answer/stream", answer_stream)
+    app.router.add_get("/healthz", health)
+    app.router.add_get("/metrics", metrics_endpoint)
+    return app
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host=API_HOST, port=API_PORT)
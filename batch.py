@@ -0,0 +1,147 @@
+"""Batch runner: answer a file of questions through the normal pipeline
+
+Questions come from a text file (one per line) or JSONL ({"question": ...,
+"lang": ..., "id": ...}). They are classified and answered by the same
+QisCrew / QisAgentChain paths as the UI, a bounded number at a time, and each
+result is appended to the output JSONL as soon as it finishes. Rerunning with
+the same output file skips questions that already have a result, so an
+interrupted run resumes where it stopped (failed ones are retried).
+
+    python batch.py questions.txt -o answers.jsonl --concurrency 4
+    python batch.py event_questions.jsonl -o warm.jsonl --warm-cache
+
+Without --warm-cache every question is answered fresh (regression runs);
+with it cached answers are reused and new ones written to the answer cache.
+Pre-warming only helps the app through the shared SQLite cache, so
+--warm-cache uses the sqlite backend at QIS_ANSWER_CACHE_PATH (the
+deployment's /data/answer_cache.sqlite by default; run it on the node that
+holds the app's volume) and refuses any other QIS_ANSWER_CACHE backend.
+Batch calls run at low priority, so the UI stays responsive during a run.
+--mode fast answers each question with a single model call instead of the crew.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from AI_Component.Context import RequestContext
+from AI_Component.Events import listen
+from AI_Component.RateLimit import request_priority
+from AI_Component.Text import normalize_question
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+def question_id(question, lang):
+    return hashlib.sha1(f"{lang.lower()}|{normalize_question(question)}".encode("utf-8")).hexdigest()[:16]
+
+def read_questions(path, lang):
+    """Yield {id, question, lang} from a text or JSONL file, skipping blanks and duplicates"""
+    seen = set()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            record = json.loads(line) if line.startswith("{") else {"question": line}
+            record.setdefault("lang", lang)
+            record.setdefault("id", question_id(record["question"], record["lang"]))
+            if record["id"] not in seen:
+                seen.add(record["id"])
+                yield record
+
+def finished_ids(path):
+    """Ids that already have a successful result in an earlier output file"""
+    done = set()
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut off by the interruption
+                    continue
+                if record.get("status") in ("answered", "rejected"):
+                    done.add(record["id"])
+    except FileNotFoundError:
+        pass
+    return done
+
+def end_partial_line(path):
+    """Terminate a line cut off by an interruption so appended results start on their own line"""
+    try:
+        with open(path, "rb+") as file:
+            file.seek(0, 2)
+            if file.tell():
+                file.seek(-1, 2)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+    except FileNotFoundError:
+        pass
+
+def run_one(record, warm_cache, mode=None):
+    from AI_Component.Pipeline import answer_question
+
+    context = RequestContext(record["question"], record["lang"])
+    events = set()
+    start = time.perf_counter()
+    try:
+        # Queued behind interactive users for every provider's capacity
+        with listen(lambda kind, data: events.add(kind)), request_priority("batch"):
+            answer = answer_question(record["question"], record["lang"], use_cache=warm_cache, context=context,
+                                     mode=mode)
+        status = "rejected" if answer is None else "answered"
+        error = None
+    except Exception as exception:
+        answer, status, error = None, "error", f"{type(exception).__name__}: {exception}"
+    return {**record, "status": status, "verdict": context.verdict, "matched_rule": context.matched_rule,
+            "cache_hit": "cache_hit" in events, "knowledge_hit": "knowledge_hit" in events,
+            "seconds": round(time.perf_counter() - start, 3), "answer": answer, "error": error}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("questions", help="text file with one question per line, or JSONL")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results, appended to and used to resume")
+    parser.add_argument("--lang", default="english", help="answer language for questions without one")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warm-cache", action="store_true", help="reuse and write the application's answer cache")
+    parser.add_argument("--limit", type=int, help="stop after this many new questions")
+    parser.add_argument("--mode", choices=["crew", "fast"], help="execution mode (default QIS_EXECUTION_MODE)")
+    args = parser.parse_args()
+
+    if args.warm_cache:
+        # An in-memory cache would be warmed for this process only and lost when it exits
+        backend = os.environ.setdefault("QIS_ANSWER_CACHE", "sqlite")
+        if backend != "sqlite":
+            parser.error(f"--warm-cache needs the shared sqlite answer cache, QIS_ANSWER_CACHE is '{backend}'")
+        from AI_Component.cache.answer_cache import CACHE_PATH
+        print(f"Warming the answer cache at {CACHE_PATH}", file=sys.stderr)
+
+    done = finished_ids(args.output)
+    pending = [record for record in read_questions(args.questions, args.lang) if record["id"] not in done]
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    print(f"{len(done)} already done, {len(pending)} to run", file=sys.stderr)
+
+    counts = {"answered": 0, "rejected": 0, "error": 0}
+    interrupted = False
+    end_partial_line(args.output)
+    start = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as output, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run_one, record, args.warm_cache, args.mode) for record in pending]
+        try:
+            for finished, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                counts[result["status"]] += 1
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                print(f"[{finished}/{len(pending)}] {result['status']:<8} {result['seconds']:>7.1f}s  {result['question'][:70]}",
+                      file=sys.stderr)
+        except KeyboardInterrupt:
+            interrupted = True
+            for future in futures:
+                future.cancel()
+            print("Interrupted, rerun the same command to resume", file=sys.stderr)
+
+    print(f"{counts['answered']} answered, {counts['rejected']} rejected, {counts['error']} failed "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    sys.exit(130 if interrupted else 1 if counts["error"] else 0)
@@ -0,0 +1,65 @@
+"""Benchmark: per-request object construction overhead, before and after agent reuse
+
+"before" builds a fresh agent set for every request like the original code did
+(Agents() in QisCrew, a module-level Agents() in Tasks, SeaqisAgents() twice
+plus a throw-away SeaqisTasks in QisAgentChain). "after" leases a prebuilt set
+from the pool and only binds the question into new Task and Crew objects.
+No LLM or search call is made; dummy keys are enough.
+
+    python -m benchmark.bench_construction --requests 200
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("groqapi_key", "gsk-benchmark")
+os.environ.setdefault("tavilyapi_key", "tvly-benchmark")
+
+from crewai import Crew, Process
+from AI_Component.Agents import Agents, agent_pool
+from AI_Component.Tasks import Tasks
+from AI_Component.qis_agent_chain import SeaqisAgents, SeaqisTasks, seaqis_agent_pool
+
+QUESTION = "How can I teach Newton's laws of motion with everyday objects?"
+
+def general_before():
+    agents = Agents()
+    tasks = Tasks(QUESTION, "english", agents=Agents())
+    return Crew(tasks=[tasks.general_search_task(), tasks.general_answer_task()],
+                agents=[agents.data_search(), agents.general_answer()], process=Process.sequential)
+
+def general_after():
+    with agent_pool.lease() as agents:
+        tasks = Tasks(QUESTION, "english", agents=agents)
+        return Crew(tasks=[tasks.general_search_task(), tasks.general_answer_task()],
+                    agents=[agents.data_search(), agents.general_answer()], process=Process.sequential)
+
+def seaqis_before():
+    agents = SeaqisAgents()
+    SeaqisTasks(QUESTION, "english", agents=SeaqisAgents())
+    tasks = SeaqisTasks(QUESTION, "english", agents=SeaqisAgents())
+    return Crew(tasks=[tasks.research_task_seaqis(), tasks.general_answer_task()],
+                agents=[agents.research_agent_seaqis(), agents.general_answer()], process=Process.sequential)
+
+def seaqis_after():
+    with seaqis_agent_pool.lease() as agents:
+        tasks = SeaqisTasks(QUESTION, "english", agents=agents)
+        return Crew(tasks=[tasks.research_task_seaqis(), tasks.general_answer_task()],
+                    agents=[agents.research_agent_seaqis(), agents.general_answer()], process=Process.sequential)
+
+def per_request_ms(build, requests):
+    build()  # warm-up, also fills the pool
+    start = time.perf_counter()
+    for _ in range(requests):
+        build()
+    return (time.perf_counter() - start) / requests * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'pipeline':<10} {'before ms/req':>14} {'after ms/req':>13}")
+    for name, before, after in (("general", general_before, general_after), ("seaqis", seaqis_before, seaqis_after)):
+        print(f"{name:<10} {per_request_ms(before, args.requests):>14.2f} {per_request_ms(after, args.requests):>13.2f}")
@@ -0,0 +1,93 @@
+"""Offline benchmark of the crew against the single-call fast path
+
+Answers the same science and SEAQIS questions through answer_question in
+both execution modes ("crew" and "fast", see AI_Component.FastPath) against
+the fake OpenAI-compatible and Tavily servers, and reports per mode and path
+the LLM calls and tokens per answer and the latency of the answer after
+classification and of the whole request.
+
+    python -m benchmark.bench_fast_path --requests 5 \\
+        --llm-latency 0.3 --search-latency 0.5 --output bench_fast_path.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+
+from benchmark import fake_openai_server, fake_search_server
+from benchmark.bench_pipeline import QUESTIONS, configure, counters, summarize, git_revision
+
+MODES = ("crew", "fast")
+
+def run_mode(mode, path, requests, fake, cold):
+    from AI_Component.Pipeline import answer_question
+    from AI_Component.Events import listen
+    from AI_Component.validator.validator import qis_validator_instance
+
+    runs = []
+    for index in range(requests):
+        if cold:
+            with qis_validator_instance._memo_lock:
+                qis_validator_instance._memo.clear()
+        marks = [(time.perf_counter(), counters(fake))]
+
+        def record(kind, data):
+            if kind == "classified":
+                marks.append((time.perf_counter(), counters(fake)))
+
+        with listen(record):
+            answer = answer_question(QUESTIONS[path][index % len(QUESTIONS[path])], "english",
+                                     use_cache=False, mode=mode)
+        (start, before), (classified, middle), (end, after) = marks[0], marks[1], (time.perf_counter(), counters(fake))
+        runs.append({"answered": answer is not None, "total_seconds": end - start, "answer_seconds": end - classified,
+                     "answer_llm_calls": after["llm_calls"] - middle["llm_calls"],
+                     **{key: after[key] - before[key] for key in after}})
+
+    return {"requests": requests, "answered": sum(run["answered"] for run in runs),
+            "total_seconds": summarize([run["total_seconds"] for run in runs]),
+            "answer_seconds": summarize([run["answer_seconds"] for run in runs]),
+            **{key: statistics.fmean(run[key] for run in runs)
+               for key in ("llm_calls", "answer_llm_calls", "prompt_tokens", "completion_tokens")}}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5, help="requests per mode and path")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--search-latency", type=float, default=0.5)
+    parser.add_argument("--warm", action="store_true", help="keep the validator memo and search cache between requests")
+    parser.add_argument("--output", default="bench_fast_path.json")
+    args = parser.parse_args()
+
+    llm_server, fake, base_url = fake_openai_server.start_server(default=fake_openai_server.ModelProfile(args.llm_latency))
+    search_server, fake_search, search_url = fake_search_server.start_server(args.search_latency)
+    configure(base_url, search_url, cold=not args.warm)
+
+    results = {
+        "revision": git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "modes": {mode: {path: run_mode(mode, path, args.requests, fake, not args.warm) for path in QUESTIONS}
+                  for mode in MODES},
+    }
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+
+    for path in QUESTIONS:
+        print(f"{path}:")
+        for mode in MODES:
+            report = results["modes"][mode][path]
+            print(f"  {mode:<5} {report['answered']}/{report['requests']} answered  "
+                  f"llm calls {report['llm_calls']:.1f} (answer {report['answer_llm_calls']:.1f})  "
+                  f"tokens {report['prompt_tokens'] + report['completion_tokens']:.0f}  "
+                  f"answer p50 {report['answer_seconds']['p50']:.3f} s  "
+                  f"total p50 {report['total_seconds']['p50']:.3f} s  p95 {report['total_seconds']['p95']:.3f} s")
+        crew, fast = results["modes"]["crew"][path], results["modes"]["fast"][path]
+        if fast["total_seconds"]["p50"]:
+            print(f"  fast path: {crew['llm_calls'] - fast['llm_calls']:.1f} fewer LLM calls, "
+                  f"{crew['total_seconds']['p50'] / fast['total_seconds']['p50']:.1f}x faster at p50")
+    print(f"Results written to {args.output}")
+
+    llm_server.shutdown()
+    search_server.shutdown()
@@ -0,0 +1,236 @@
+"""Offline end-to-end benchmark of the answer pipeline
+
+Runs the real QisValidator, QisCrew and QisAgentChain code paths (through
+answer_question) against the local fake OpenAI-compatible server and the fake
+Tavily search server, both with configurable latency. Reports per request and
+stage the wall time, LLM calls and prompt/completion tokens, the agent/task/
+crew construction overhead, and throughput at N concurrent sessions. The
+results are written as JSON; pass an earlier file as --baseline to print the
+change of the headline numbers.
+
+    python -m benchmark.bench_pipeline --requests 5 --sessions 1 4 8 \\
+        --llm-latency 0.3 --search-latency 0.5 --output bench_pipeline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import fake_openai_server, fake_search_server
+
+QUESTIONS = {
+    "science": [
+        "How can I teach Newton's laws of motion with everyday objects?",
+        "What is a good hands-on activity to explain photosynthesis to grade 7 students?",
+        "How do I assess students' understanding of the water cycle?",
+    ],
+    "seaqis": [
+        "What programs does SEAMEO QIS run for science teachers?",
+        "Where is SEAMEO QITEP in Science located?",
+        "What is the purpose of SEAQIS?",
+    ],
+}
+
+STAGES = ("classification", "research", "answer")
+
+def configure(base_url, search_url, cold):
+    """Point every client at the fakes; must run before the app modules are imported"""
+    os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_API_BASE"] = base_url
+    os.environ["QIS_GROQ_BASE_URL"] = base_url
+    os.environ["QIS_TAVILY_URL"] = search_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("groqapi_key", "gsk-benchmark")
+    os.environ.setdefault("tavilyapi_key", "tvly-benchmark")
+    # Measure the full path, not the answer cache
+    os.environ["QIS_ANSWER_CACHE"] = "off"
+    if cold:
+        os.environ["QIS_SEARCH_CACHE_TTL"] = "0"
+
+def counters(fake):
+    """Calls and tokens summed over all models of the fake API"""
+    with fake._lock:
+        totals = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        for stats in fake.stats.values():
+            totals["llm_calls"] += stats["calls"]
+            totals["prompt_tokens"] += stats["prompt_tokens"]
+            totals["completion_tokens"] += stats["completion_tokens"]
+        return totals
+
+class StageRecorder:
+    """Pipeline event listener that splits one request into stages
+
+    classification ends at "classified", research at the first finished crew
+    task, answer at the end of the request. Each stage gets the LLM calls and
+    tokens the fake API counted meanwhile, so requests must run one at a time.
+    """
+
+    def __init__(self, fake):
+        self.fake = fake
+        self.marks = [(time.perf_counter(), counters(fake))]
+        self.search_seconds = 0.0
+        self.searches = 0
+        self.tokens_saved = 0
+        self._search_started = None
+
+    def __call__(self, kind, data):
+        if kind == "search_started":
+            self._search_started = time.perf_counter()
+        elif kind == "search_finished" and self._search_started is not None:
+            self.search_seconds += time.perf_counter() - self._search_started
+            self.searches += 1
+        elif kind == "compacted":
+            self.tokens_saved += data["tokens_saved"]
+        elif kind == "classified" or (kind == "task_finished" and len(self.marks) == 2):
+            self.marks.append((time.perf_counter(), counters(self.fake)))
+
+    def finish(self):
+        self.marks.append((time.perf_counter(), counters(self.fake)))
+        stages = {}
+        for name, (start, before), (end, after) in zip(STAGES, self.marks, self.marks[1:]):
+            stages[name] = {"seconds": end - start, **{key: after[key] - before[key] for key in after}}
+        (start, before), (end, after) = self.marks[0], self.marks[-1]
+        stages["total"] = {"seconds": end - start, **{key: after[key] - before[key] for key in after}}
+        stages["search"] = {"seconds": self.search_seconds, "tool_calls": self.searches, "tokens_saved": self.tokens_saved}
+        return stages
+
+def summarize(values):
+    values = sorted(values)
+    return {"p50": statistics.median(values), "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "mean": statistics.fmean(values)}
+
+def run_path(path, requests, fake, cold):
+    from AI_Component.Pipeline import answer_question
+    from AI_Component.Events import listen
+    from AI_Component.validator.validator import qis_validator_instance
+
+    runs = []
+    for index in range(requests):
+        if cold:
+            with qis_validator_instance._memo_lock:
+                qis_validator_instance._memo.clear()
+        recorder = StageRecorder(fake)
+        with listen(recorder):
+            answer = answer_question(QUESTIONS[path][index % len(QUESTIONS[path])], "english", use_cache=False)
+        run = recorder.finish()
+        run["answered"] = answer is not None
+        runs.append(run)
+
+    report = {"requests": requests, "answered": sum(run["answered"] for run in runs)}
+    for stage in (*STAGES, "search", "total"):
+        samples = [run[stage] for run in runs if stage in run]
+        if not samples:
+            continue
+        report[stage] = {"seconds": summarize([sample["seconds"] for sample in samples])}
+        for key in samples[0]:
+            if key != "seconds":
+                report[stage][key] = statistics.fmean(sample[key] for sample in samples)
+    return report
+
+def construction_overhead(requests):
+    """ms per request to bind a question into agents, tasks and a crew (fresh vs pooled agents)"""
+    from benchmark import bench_construction as construction
+
+    return {
+        "general_fresh_ms": construction.per_request_ms(construction.general_before, requests),
+        "general_pooled_ms": construction.per_request_ms(construction.general_after, requests),
+        "seaqis_fresh_ms": construction.per_request_ms(construction.seaqis_before, requests),
+        "seaqis_pooled_ms": construction.per_request_ms(construction.seaqis_after, requests),
+    }
+
+def throughput(sessions, requests):
+    """Answers per second with `sessions` users asking distinct questions concurrently"""
+    from AI_Component.Pipeline import answer_question
+
+    questions = [question for path in QUESTIONS.values() for question in path]
+    jobs = [f"{questions[index % len(questions)]} (session {index})" for index in range(sessions * requests)]
+    latencies = []
+
+    def ask(question):
+        start = time.perf_counter()
+        answer_question(question, "english", use_cache=False)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(ask, jobs))
+    elapsed = time.perf_counter() - start
+    return {"sessions": sessions, "requests": len(jobs), "seconds": elapsed,
+            "answers_per_second": len(jobs) / elapsed, "latency": summarize(latencies)}
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def headline(results):
+    """Flat {metric: value} of the numbers compared against a baseline"""
+    numbers = {}
+    for path, report in results["paths"].items():
+        numbers[f"{path}.total_p50_s"] = report["total"]["seconds"]["p50"]
+        numbers[f"{path}.llm_calls"] = report["total"]["llm_calls"]
+        numbers[f"{path}.tokens"] = report["total"]["prompt_tokens"] + report["total"]["completion_tokens"]
+    for name, value in results["construction"].items():
+        numbers[f"construction.{name}"] = value
+    for run in results["throughput"]:
+        numbers[f"throughput.{run['sessions']}_sessions_per_s"] = run["answers_per_second"]
+    return numbers
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5, help="requests per path, and per session for throughput")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--search-latency", type=float, default=0.5)
+    parser.add_argument("--construction-requests", type=int, default=50)
+    parser.add_argument("--warm", action="store_true", help="keep the validator memo and search cache between requests")
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    llm_server, fake, base_url = fake_openai_server.start_server(default=fake_openai_server.ModelProfile(args.llm_latency))
+    search_server, fake_search, search_url = fake_search_server.start_server(args.search_latency)
+    configure(base_url, search_url, cold=not args.warm)
+
+    results = {
+        "revision": git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "paths": {path: run_path(path, args.requests, fake, not args.warm) for path in QUESTIONS},
+        "construction": construction_overhead(args.construction_requests),
+        "throughput": [throughput(sessions, args.requests) for sessions in args.sessions],
+        "llm_by_model": fake.stats,
+        "searches": fake_search.searches,
+    }
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+
+    for path, report in results["paths"].items():
+        print(f"{path}: {report['answered']}/{report['requests']} answered")
+        for stage in (*STAGES, "search", "total"):
+            if stage in report:
+                extra = "  ".join(f"{key} {value:.1f}" for key, value in report[stage].items() if key != "seconds")
+                print(f"  {stage:<15} p50 {report[stage]['seconds']['p50']:.3f} s  p95 {report[stage]['seconds']['p95']:.3f} s  {extra}")
+    for name, value in results["construction"].items():
+        print(f"construction {name:<18} {value:.2f}")
+    for run in results["throughput"]:
+        print(f"throughput {run['sessions']:>3} sessions  {run['answers_per_second']:.2f} answers/s  p95 {run['latency']['p95']:.2f} s")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            before = headline(json.load(baseline_file))
+        after = headline(results)
+        print(f"\nChange against {args.baseline}:")
+        for metric, value in after.items():
+            if before.get(metric):
+                print(f"  {metric:<40} {before[metric]:>10.3f} -> {value:>10.3f}  ({(value - before[metric]) / before[metric] * 100:+.1f}%)")
+
+    llm_server.shutdown()
+    search_server.shutdown()
@@ -0,0 +1,75 @@
+"""Micro-benchmark: per-question cost of the rule fallback as the rule set grows
+
+Compares the old approach (one re.search / substring test per rule in a Python
+loop) with the shared RuleEngine compiled into one alternation per label.
+
+    python -m benchmark.bench_rules --sizes 25 100 400 1600
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from AI_Component.validator.rules import RuleEngine, SEAQIS, SEAQIS_PATTERNS, SEAQIS_KEYWORDS, SCIENCE, SCIENCE_PATTERNS
+
+QUESTIONS = [
+    "How do I cook pasta?",
+    "What are the best practices for teaching science in high school?",
+    "Apa program SEAQIS?",
+    "Bagaimana cara mengajarkan fotosintesis kepada siswa SD?",
+    "Tell me about the latest smartphone and its camera features",
+    "วิธีสอนวิทยาศาสตร์ให้นักเรียนสนใจ",
+]
+
+def synthetic_phrases(count, seed=7):
+    """Random multi-word phrases standing in for future Indonesian/English/Thai rules"""
+    rng = random.Random(seed)
+    words = lambda: " ".join("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(rng.randint(1, 3)))
+    return [words() for _ in range(count)]
+
+def build_rules(size):
+    extra = synthetic_phrases(max(0, size - len(SEAQIS_PATTERNS) - len(SEAQIS_KEYWORDS) - len(SCIENCE_PATTERNS)))
+    keywords = SEAQIS_KEYWORDS + extra
+    return SEAQIS_PATTERNS, keywords, SCIENCE_PATTERNS
+
+def linear_match(question, patterns, keywords, science_patterns):
+    """The pre-engine implementation: rebuild nothing, but test every rule in turn"""
+    question_lower = question.lower()
+    for pattern in patterns:
+        if re.search(pattern, question_lower):
+            return SEAQIS
+    for keyword in keywords:
+        if keyword.lower() in question_lower:
+            return SEAQIS
+    for pattern in science_patterns:
+        if re.search(pattern, question_lower):
+            return SCIENCE
+    return None
+
+def time_per_question(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            function(question)
+    return (time.perf_counter() - start) / (repeat * len(QUESTIONS)) * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[36, 100, 400, 1600])
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'rules':>6} {'linear us/q':>12} {'engine us/q':>12} {'speedup':>8}")
+    for size in args.sizes:
+        patterns, keywords, science_patterns = build_rules(size)
+        engine = RuleEngine().add_patterns(SEAQIS, patterns).add_keywords(SEAQIS, keywords).add_patterns(SCIENCE, science_patterns).compile()
+
+        for question in QUESTIONS:
+            expected = linear_match(question, patterns, keywords, science_patterns)
+            found = engine.match(question)
+            assert (found.label if found else None) == expected, question
+
+        linear = time_per_question(lambda q: linear_match(q, patterns, keywords, science_patterns), args.repeat)
+        compiled = time_per_question(engine.match, args.repeat)
+        print(f"{engine.size():>6} {linear:>12.2f} {compiled:>12.2f} {linear / compiled:>7.1f}x")
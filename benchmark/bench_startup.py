@@ -0,0 +1,59 @@
+"""Startup-time measurement: import cost per module of the app
+
+Runs each module import in a fresh interpreter with `python -X importtime`
+and reports its cumulative import time plus the heaviest packages it pulled
+in, so deferred crewai/langchain imports can be checked after every change.
+
+    python -m benchmark.bench_startup
+    python -m benchmark.bench_startup --modules AI_Component.Pipeline --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+MODULES = [
+    "AI_Component.Llms",
+    "AI_Component.Agents",
+    "AI_Component.Tasks",
+    "AI_Component.Crew",
+    "AI_Component.validator.validator",
+    "AI_Component.qis_agent_chain",
+    "AI_Component.Pipeline",
+]
+
+def import_times(module):
+    """Return {imported module: (self us, cumulative us)} for one fresh import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--top", type=int, default=5, help="heaviest top-level packages to list per module")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            times = import_times(module)
+        except RuntimeError as error:
+            print(f"{module:<36} failed: {error}")
+            continue
+        total = times.get(module, (0, 0))[1]
+        packages = {}
+        for name, (self_us, _) in times.items():
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + self_us
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        print(f"{module:<36} {total / 1000:>9.1f} ms   " + ", ".join(f"{name} {us / 1000:.1f} ms" for name, us in heaviest))
@@ -0,0 +1,75 @@
+"""Offline harness for the model cascade in AI_Component/Router.py
+
+Starts the fake OpenAI-compatible server with a slow, flaky small model and
+points every client at it, then sends validation and answer prompts through
+model_router and prints which tier answered, the fallbacks taken and the
+per-tier latency the router recorded. No real API key or network is used.
+
+    python -m benchmark.cascade_harness --requests 20 --mini-failure 0.3
+"""
+import argparse
+import os
+import time
+
+from benchmark.fake_openai_server import start_server, ModelProfile
+
+QUESTIONS = [
+    "What is photosynthesis?",
+    "Where is SEAMEO QIS located?",
+    "Compare inquiry-based learning and direct instruction for teaching electricity, and design a rubric for it",
+    "How do magnets work?",
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--mini-latency", type=float, default=0.05)
+    parser.add_argument("--mini-failure", type=float, default=0.3)
+    parser.add_argument("--full-latency", type=float, default=0.4)
+    parser.add_argument("--cooldown", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server, fake, base_url = start_server({
+        "gpt-4o-mini": ModelProfile(args.mini_latency, args.mini_failure),
+        "gpt-4o": ModelProfile(args.full_latency),
+        "groq/llama-3.2-3b-preview": ModelProfile(args.mini_latency),
+    })
+    # Must be set before the clients are built
+    os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_API_BASE"] = base_url
+    os.environ["QIS_GROQ_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-harness")
+    os.environ.setdefault("groqapi_key", "gsk-harness")
+    # Plain chat tiers only, the streaming tiers need crewai's event bus
+    os.environ.setdefault("QIS_ROUTE_ANSWER_EASY", "openai_mini,openai")
+    os.environ.setdefault("QIS_ROUTE_ANSWER_HARD", "openai,openai_mini")
+
+    from AI_Component.Router import ModelRouter, question_difficulty
+    from AI_Component.validator.validator import VALIDATOR_TEMPLATE
+
+    router = ModelRouter(cooldown=args.cooldown)
+    answered = {}
+    start = time.perf_counter()
+    for index in range(args.requests):
+        question = QUESTIONS[index % len(QUESTIONS)]
+        for role, prompt in (("validation", VALIDATOR_TEMPLATE.format(question=question)), ("answer", question)):
+            try:
+                _, tier = router.invoke(role, prompt, question)
+            except Exception as error:
+                tier = f"failed ({type(error).__name__})"
+            key = f"{role}/{question_difficulty(question)}" if role == "answer" else role
+            answered.setdefault(key, {}).setdefault(tier, 0)
+            answered[key][tier] += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.requests} requests in {elapsed:.2f} s\n")
+    print("Tier that answered per role:")
+    for role, tiers in answered.items():
+        print(f"  {role:<16} " + ", ".join(f"{tier} x{count}" for tier, count in tiers.items()))
+    print("\nRouter latency per tier:")
+    for tier, stats in router.stats().items():
+        print(f"  {tier:<20} calls {stats['calls']:>4}  errors {stats['errors']:>3}  "
+              f"avg {stats['avg_seconds']} s  max {stats['max_seconds']} s")
+    print("\nFake server calls per model:")
+    for model, stats in fake.stats.items():
+        print(f"  {model:<28} {stats}")
+    server.shutdown()
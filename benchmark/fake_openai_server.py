@@ -0,0 +1,177 @@
+"""Local fake of the OpenAI-compatible API for offline benchmarks and tests
+
+Serves /v1/chat/completions (plain and streamed) and /v1/completions with a
+configurable latency and failure rate per model, and counts calls and tokens
+per model on GET /stats (POST /stats/reset clears them). Point the clients at
+it with OPENAI_BASE_URL / OPENAI_API_BASE=http://127.0.0.1:<port>/v1.
+
+    python -m benchmark.fake_openai_server --port 8765 \\
+        --model gpt-4o-mini:0.2:0 --model gpt-4o:1.5:0.1
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+DEFAULT_ANSWER = ("Final Answer: Science teaching works best when students investigate real phenomena, "
+                  "discuss their evidence and explain it in their own words. See https://www.qitepinscience.org")
+
+class ModelProfile:
+    """Latency (seconds) and failure rate (0..1) of one fake model"""
+
+    def __init__(self, latency=0.0, failure_rate=0.0, answer=DEFAULT_ANSWER):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.answer = answer
+
+    @classmethod
+    def parse(cls, spec):
+        """"model:latency:failure_rate" -> (model, ModelProfile)"""
+        name, latency, failure_rate = (spec.split(":") + ["0", "0"])[:3]
+        return name, cls(float(latency), float(failure_rate))
+
+def count_tokens(text):
+    # Close enough to a BPE count for benchmark bookkeeping
+    return max(1, len(text) // 4)
+
+class FakeOpenAI:
+    def __init__(self, profiles=None, default=None):
+        self.profiles = profiles or {}
+        self.default = default or ModelProfile()
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def profile(self, model):
+        return self.profiles.get(model, self.default)
+
+    def record(self, model, prompt_tokens, completion_tokens, failed):
+        with self._lock:
+            stats = self.stats.setdefault(model, {"calls": 0, "failures": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            stats["calls"] += 1
+            stats["failures"] += failed
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+
+    def answer(self, model, prompt):
+        """Return (answer text, usage) or None when this call should fail"""
+        profile = self.profile(model)
+        time.sleep(profile.latency)
+        prompt_tokens = count_tokens(prompt)
+        if random.random() < profile.failure_rate:
+            self.record(model, prompt_tokens, 0, True)
+            return None
+        text = profile.answer
+        tool = re.search(r"Tool Name: (\S+)", prompt)
+        if tool and "Observation:" not in prompt:
+            # A crewai agent with a tool searches once before its final answer
+            text = f'Thought: I should search first.\nAction: {tool.group(1)}\nAction Input: {{"query": "science education"}}'
+        # The validator expects a label back
+        if "Answer only with 'SEAQIS', 'SCIENCE' or 'REJECT'" in prompt:
+            question = prompt.rsplit("Question:", 1)[-1].split("\n\n")[0].lower()
+            text = "SEAQIS" if "seameo" in question or "seaqis" in question else "SCIENCE"
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": count_tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.record(model, prompt_tokens, usage["completion_tokens"], False)
+        return text, usage
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                with fake._lock:
+                    return self.send_json(200, fake.stats)
+            self.send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            path = self.path.rstrip("/")
+            if path == "/stats/reset":
+                with fake._lock:
+                    fake.stats.clear()
+                return self.send_json(200, {})
+            if path.endswith("/chat/completions"):
+                prompt = "\n".join(str(message.get("content") or "") for message in body.get("messages", []))
+                chat = True
+            elif path.endswith("/completions"):
+                prompt = body.get("prompt") or ""
+                prompt = "\n".join(prompt) if isinstance(prompt, list) else prompt
+                chat = False
+            else:
+                return self.send_json(404, {"error": {"message": "not found"}})
+
+            model = body.get("model", "unknown")
+            result = fake.answer(model, prompt)
+            if result is None:
+                return self.send_json(500, {"error": {"message": f"injected failure for {model}", "type": "server_error"}})
+            text, usage = result
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            if body.get("stream"):
+                return self.stream(completion_id, model, text, usage, chat)
+            if chat:
+                choice = {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                kind = "chat.completion"
+            else:
+                choice = {"index": 0, "text": text, "finish_reason": "stop", "logprobs": None}
+                kind = "text_completion"
+            self.send_json(200, {"id": completion_id, "object": kind, "created": int(time.time()),
+                                 "model": model, "choices": [choice], "usage": usage})
+
+        def stream(self, completion_id, model, text, usage, chat):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            words = text.split(" ")
+            for index, word in enumerate(words):
+                piece = word if index == 0 else " " + word
+                delta = {"content": piece} if chat else None
+                choice = {"index": 0, "delta": delta, "finish_reason": None} if chat else {"index": 0, "text": piece, "finish_reason": None}
+                self.write_event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                                  "model": model, "choices": [choice]})
+            final = {"index": 0, "delta": {}, "finish_reason": "stop"} if chat else {"index": 0, "text": "", "finish_reason": "stop"}
+            self.write_event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                              "model": model, "choices": [final], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def write_event(self, data):
+            self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    return Handler
+
+def start_server(profiles=None, host="127.0.0.1", port=0, default=None):
+    """Start the fake API on a background thread; returns (server, fake, base_url)"""
+    fake = FakeOpenAI(profiles, default)
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, fake, f"http://{host}:{server.server_address[1]}/v1"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model", action="append", default=[], help="model:latency:failure_rate, repeatable")
+    args = parser.parse_args()
+
+    server, fake, base_url = start_server(dict(ModelProfile.parse(spec) for spec in args.model), args.host, args.port)
+    print(f"Fake OpenAI API on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
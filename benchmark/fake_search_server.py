@@ -0,0 +1,80 @@
+"""Local fake of the Tavily search API for offline benchmarks
+
+Answers POST /search like https://api.tavily.com/search after a configurable
+latency and counts the searches (GET /stats). Point the client at it with
+QIS_TAVILY_URL=http://127.0.0.1:<port>/search.
+
+    python -m benchmark.fake_search_server --port 8766 --latency 0.8
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
+import json
+import threading
+import time
+
+class FakeSearch:
+    def __init__(self, latency=0.0, results=5):
+        self.latency = latency
+        self.results = results
+        self.searches = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, max_results):
+        time.sleep(self.latency)
+        with self._lock:
+            self.searches += 1
+        return [{"url": f"https://example.org/science/{index}",
+                 "title": f"Result {index} for {query}",
+                 "content": f"Background on {query}: teachers use hands-on inquiry, models and "
+                            f"formative assessment to build understanding (source {index}).",
+                 "score": round(1 - index / 10, 2)}
+                for index in range(min(self.results, max_results))]
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                return self.send_json(200, {"searches": fake.searches})
+            self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path.rstrip("/") != "/search":
+                return self.send_json(404, {"error": "not found"})
+            query = body.get("query", "")
+            self.send_json(200, {"query": query, "results": fake.search(query, body.get("max_results", 5))})
+
+    return Handler
+
+def start_server(latency=0.0, host="127.0.0.1", port=0):
+    """Start the fake search API on a background thread; returns (server, fake, search_url)"""
+    fake = FakeSearch(latency)
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, fake, f"http://{host}:{server.server_address[1]}/search"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server, fake, url = start_server(args.latency, args.host, args.port)
+    print(f"Fake search API on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,9 +1,7 @@
-from AI_Component.Crew import *
-from AI_Component.validator.validator import *
-from AI_Component.qis_agent_chain import is_seaqis_question, QisAgentChain
+from Component.ApiClient import API_URL, stream_answer_remote
 import Component.Logo as Img
 import streamlit as st
-import time
+import uuid
 
 # Set page config (must be at the top)
 Img.set_page_config(
@@ -17,49 +15,83 @@ st.title("SEAMEO QIS")
 st.write("SciMentor is your friend when you're curious about science experiments, STEM concepts, or fun ways to teach science. Like a science teacher who never gets tired of explaining, but digital version and can be talked to anytime.")
 st.write("Koordinator Gatot HP - www.gaeni.org ")
 input = st.text_input("Enter your question")
-lang = "english"
+# The answer is written once and translated, so switching language is cheap
+lang = st.selectbox("Answer language", ["english", "indonesian", "thai", "vietnamese"],
+                    format_func={"english": "English", "indonesian": "Bahasa Indonesia",
+                                 "thai": "ภาษาไทย", "vietnamese": "Tiếng Việt"}.get)
+# One search and a single answer call instead of the research crew
+mode = "fast" if st.checkbox("Quick answer") else "crew"
 submit = st.button("Start Search")
 
+# Follow-up questions of this browser session reuse the evidence of the earlier ones
+if st.button("New conversation"):
+    st.session_state.pop("conversation", None)
+    st.session_state.pop("conversation_id", None)
+if "conversation_id" not in st.session_state:
+    st.session_state["conversation_id"] = uuid.uuid4().hex
+# Stable for the browser session, so the API limits each user separately
+if "client_id" not in st.session_state:
+    st.session_state["client_id"] = uuid.uuid4().hex
+
 if submit:
-    # Enhanced question validation with SEAQIS context detection
-    is_science_related = qis_validator(input)
-    is_seaqis_related = is_seaqis_question(input)
+    # Progress follows the real pipeline stages; classification (rules first, then
+    # at most one LLM call) runs while the web search for the question already starts
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    answer_box = st.empty()
+    streamed = ""
+    result = None
     
-    if is_science_related or is_seaqis_related:
-        # If valid, proceed to main process
-        with st.spinner('🤖 SciMentor is thinking... Please wait'):
-            # Show progress bar with realistic timing
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # Simulate processing steps
-            status_text.text('🔍 Analyzing your question...')
-            progress_bar.progress(25)
-            time.sleep(0.5)
-            
+    status_text.text('🔍 Analyzing your question...')
+    progress_bar.progress(10)
+    if API_URL:
+        # Thin client: the worker tier behind api.py runs the pipeline
+        events = stream_answer_remote(input, lang, mode=mode, session=st.session_state["conversation_id"],
+                                      client=st.session_state["client_id"])
+    else:
+        from AI_Component.Pipeline import stream_answer
+        from AI_Component.Session import ConversationSession
+        from AI_Component.Tracing import start_metrics_server
+        # Prometheus /metrics of this process when QIS_METRICS_PORT is set
+        start_metrics_server()
+        if "conversation" not in st.session_state:
+            st.session_state["conversation"] = ConversationSession()
+        events = stream_answer(input, lang, session=st.session_state["conversation"], mode=mode)
+    for kind, data in events:
+        if kind == "classified":
+            status_text.text('🧠 Question validated, preparing the research...')
+            progress_bar.progress(20)
+        elif kind == "cache_hit":
+            status_text.text('⚡ Found a previous answer to this question')
+        elif kind == "knowledge_hit":
+            status_text.text('📚 Answering from SEAQIS documents...')
+            progress_bar.progress(60)
+        elif kind == "search_started":
+            status_text.text('🔍 Searching science sources...')
+            progress_bar.progress(40)
+        elif kind == "search_finished":
             status_text.text('🧠 Processing science knowledge...')
-            progress_bar.progress(50)
-            time.sleep(0.5)
-            
+            progress_bar.progress(60)
+        elif kind == "writing_started":
             status_text.text('📚 Generating response...')
             progress_bar.progress(75)
-            
-            # Use the appropriate agent chain based on context
-            if is_seaqis_related:
-                # Use the specialized SEAQIS agent chain
-                result = QisAgentChain(input, lang).process_question()
-            else:
-                # Use the general science education agent chain
-                result = QisCrew(input, lang).generalCrew().kickoff()
-            
-            status_text.text('✅ Complete!')
-            progress_bar.progress(100)
-            time.sleep(0.3)
-            
-            # Clean up progress indicators
-            progress_bar.empty()
-            status_text.empty()
-        st.markdown(result)
+        elif kind == "translating":
+            status_text.text('🌐 Translating the answer...')
+            progress_bar.progress(90)
+        elif kind == "token":
+            # Render the answer as it is written
+            streamed += data["text"]
+            answer_box.markdown(streamed)
+        elif kind == "done":
+            result = data["answer"]
+        elif kind == "error":
+            raise data["error"]
+    
+    # Clean up progress indicators
+    progress_bar.empty()
+    status_text.empty()
+    if result is not None:
+        answer_box.markdown(result)
     else:
         # If not valid, show error message
         st.error("Your question is not related to science education or SEAMEO QIS topics. Please ask a relevant question.")
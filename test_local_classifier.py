@@ -0,0 +1,78 @@
+"""Local intent classifier on held-out questions: in-scope science is not rejected
+
+None of these questions are in the training data (checked below), so the
+rates measure how the model generalizes. Runs offline:
+python test_local_classifier.py (or pytest test_local_classifier.py)
+"""
+from AI_Component.validator.local_classifier import LocalIntentClassifier, load_labelled_questions, load_test_validator_cases
+import time
+
+# Share of held-out science questions the model itself may label reject
+MAX_FALSE_REJECT_RATE = 0.1
+
+held_out_science = [
+    "What is the boiling point of water?",
+    "How do volcanoes erupt?",
+    "What is photosynthesis?",
+    "Why do leaves change colour in autumn?",
+    "What is Newton's third law?",
+    "How do batteries store energy?",
+    "What is an acid?",
+    "How does the water cycle work?",
+    "What are renewable energy sources?",
+    "Why is the ocean salty?",
+    "What is a chemical bond?",
+    "How do bees pollinate flowers?",
+    "What is the function of the lungs?",
+    "How does a thermometer work?",
+    "What is kinetic energy?",
+    "Apa itu fotosintesis?",
+    "Bagaimana cara kerja magnet?",
+    "Apa penyebab gempa bumi?",
+    "What is the melting point of ice?",
+    "How do fish breathe underwater?",
+    "How can I teach density with a hands-on activity?",
+    "What is an atom made of?",
+    "Why do we have day and night?",
+    "What is static electricity?",
+]
+
+held_out_off_topic = [
+    "What is the population of Jakarta?",
+    "Who is the president of Indonesia?",
+    "How do I bake a cake?",
+    "What is the best phone to buy?",
+    "Why is my wifi slow?",
+    "What is the exchange rate of the dollar?",
+    "How do I get a visa for Thailand?",
+    "Berapa harga tiket pesawat ke Bali?",
+]
+
+def test_questions_are_held_out():
+    trained = {question for question, _ in load_labelled_questions() + load_test_validator_cases()}
+    assert not trained & set(held_out_science + held_out_off_topic)
+
+def test_science_false_reject_rate():
+    model = LocalIntentClassifier.load()
+    rejected = [question for question in held_out_science if model.predict(question)[0] == "reject"]
+    assert len(rejected) / len(held_out_science) <= MAX_FALSE_REJECT_RATE, rejected
+    # Whatever the model predicts, a reject is left to the LLM
+    assert all(model.decide(question) != "reject" for question in held_out_science)
+
+def test_off_topic_questions_are_not_accepted_locally():
+    model = LocalIntentClassifier.load()
+    accepted = [question for question in held_out_off_topic if model.decide(question) is not None]
+    assert not accepted, accepted
+
+def test_confident_rejects_are_decided_when_configured():
+    model = LocalIntentClassifier.load(reject_threshold=0.9)
+    assert model.decide("How do I bake a cake?") == "reject"
+    assert LocalIntentClassifier.load().decide("How do I bake a cake?") is None
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    test_questions_are_held_out()
+    test_science_false_reject_rate()
+    test_off_topic_questions_are_not_accepted_locally()
+    test_confident_rejects_are_decided_when_configured()
+    print(f"Local classifier tests passed in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,117 @@
+"""Rate limiter: interactive calls go before batch calls, a 429 holds the provider
+
+Runs offline: python test_rate_limit.py (or pytest test_rate_limit.py)
+"""
+from AI_Component.RateLimit import ProviderLimiter, request_priority
+from AI_Component.HttpClients import RateLimitedTransport
+import threading
+import asyncio
+import httpx
+import time
+
+def wait_until_queued(limiter, **depth):
+    while any(limiter.queue_depth()[level] < count for level, count in depth.items()):
+        time.sleep(0.001)
+
+def test_interactive_calls_go_before_queued_batch_calls():
+    limiter = ProviderLimiter("test")
+    # Nobody gets through until the pause ends, so both callers queue up
+    limiter.pause(0.5)
+    served = []
+
+    def call(level):
+        with request_priority(level):
+            limiter.acquire()
+        served.append(level)
+
+    batch = threading.Thread(target=call, args=("batch",))
+    batch.start()
+    wait_until_queued(limiter, batch=1)
+    interactive = threading.Thread(target=call, args=("interactive",))
+    interactive.start()
+    wait_until_queued(limiter, batch=1, interactive=1)
+    batch.join(5)
+    interactive.join(5)
+    # The batch call was queued first but the interactive one is served first
+    assert served == ["interactive", "batch"]
+    assert limiter.queue_depth() == {"interactive": 0, "batch": 0}
+
+def test_pause_holds_every_caller():
+    limiter = ProviderLimiter("test")
+    assert limiter.acquire() < 0.05
+    limiter.pause(0.2)
+    assert limiter.acquire() >= 0.19
+    assert limiter.throttled == 1
+
+def test_coroutines_wait_out_a_pause_without_threads(callers=50):
+    limiter = ProviderLimiter("test")
+    limiter.pause(0.2)
+    threads = threading.active_count()
+
+    async def main():
+        waiting = asyncio.gather(*(limiter.aacquire() for _ in range(callers)))
+        await asyncio.sleep(0.1)
+        # Every caller is queued, none of them on a worker thread
+        assert sum(limiter.queue_depth().values()) == callers
+        assert threading.active_count() == threads
+        return await waiting
+
+    assert min(asyncio.run(main())) >= 0.19
+    assert limiter.queue_depth() == {"interactive": 0, "batch": 0}
+
+def test_coroutines_keep_the_priority_order():
+    limiter = ProviderLimiter("test")
+    limiter.pause(0.2)
+    served = []
+
+    async def call(level):
+        await limiter.aacquire(priority=level)
+        served.append(level)
+
+    async def main():
+        batch = asyncio.ensure_future(call("batch"))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(batch, call("interactive"))
+
+    asyncio.run(main())
+    assert served == ["interactive", "batch"]
+
+class ScriptedTransport(httpx.HTTPTransport):
+    """Replies with the scripted responses in order instead of going to the network"""
+
+    def __init__(self, responses, **kwargs):
+        super().__init__(**kwargs)
+        self.responses = list(responses)
+        self.sent = []
+
+    def handle_request(self, request):
+        self.sent.append(time.monotonic())
+        return self.responses.pop(0)
+
+class ThrottledTransport(RateLimitedTransport, ScriptedTransport):
+    pass
+
+def test_429_pauses_the_provider_for_its_retry_after():
+    transport = ThrottledTransport("test", retries=1, responses=[
+        httpx.Response(429, headers={"retry-after": "0.3"}),
+        httpx.Response(200, json={"answer": "ok"}),
+    ])
+    transport.limiter = ProviderLimiter("test")
+    with httpx.Client(transport=transport) as client:
+        response = client.post("https://api.example.com/v1/chat/completions", json={"query": "q"})
+    assert response.status_code == 200
+    assert transport.limiter.throttled == 1
+    # The retry waited out the provider's Retry-After
+    first, retry = transport.sent
+    assert retry - first >= 0.29
+    # and so would any other caller of the provider until then
+    assert transport.limiter.paused_until - first >= 0.29
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    test_interactive_calls_go_before_queued_batch_calls()
+    test_pause_holds_every_caller()
+    test_coroutines_wait_out_a_pause_without_threads()
+    test_coroutines_keep_the_priority_order()
+    test_429_pauses_the_provider_for_its_retry_after()
+    print(f"Rate limiter tests passed in {time.perf_counter() - start:.2f}s")
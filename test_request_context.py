@@ -0,0 +1,91 @@
+"""Concurrency stress test: per-question state must stay isolated between sessions
+
+The model call is replaced by a deterministic fake with random latency and the
+crew by a function that returns the prompt it would have received, so this
+runs offline: python test_request_context.py (or pytest test_request_context.py)
+"""
+from AI_Component.validator.validator import QisValidator, SCIENCE, SEAQIS, REJECT
+from AI_Component.qis_agent_chain import QisAgentChain, inject_context
+from AI_Component.Context import RequestContext
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+
+SEAQIS_PREFIX = "User is asking about SEAMEO QIS."
+
+class FakeModelValidator(QisValidator):
+    """QisValidator whose model call is a slow, deterministic stand-in"""
+
+    def __init__(self):
+        super().__init__()
+        # Force every question past the rules through the (fake) model call
+        self.local_classifier = None
+
+    def llm_verdict(self, question):
+        time.sleep(random.uniform(0, 0.003))
+        return SCIENCE if question.startswith("Explain") else REJECT
+
+class PromptRecordingChain(QisAgentChain):
+    """Agent chain that returns the prompt instead of running the crew"""
+
+    def run_crew(self, enhanced_input, prefetched, agents):
+        time.sleep(random.uniform(0, 0.003))
+        return enhanced_input
+
+    def run_knowledge_crew(self, enhanced_input, documents, agents):
+        return self.run_crew(enhanced_input, documents, agents)
+
+def make_questions(count):
+    questions = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            questions.append((f"Apa program SEAQIS nomor {i}?", SEAQIS))
+        elif kind == 1:
+            questions.append((f"Explain experiment {i} about light", SCIENCE))
+        else:
+            questions.append((f"Recipe number {i} for dinner", REJECT))
+    random.shuffle(questions)
+    return questions
+
+def answer(validator, question, expected):
+    context = RequestContext(question)
+    verdict = validator.classify(question, context)
+    prompt = None
+    if verdict == SEAQIS:
+        prompt = PromptRecordingChain(question, "english", agents=object()).process_question(verdict=verdict, context=context)
+    return question, expected, context, prompt
+
+def test_verdicts_and_prompts_stay_isolated(count=600, workers=32):
+    validator = FakeModelValidator()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda case: answer(validator, *case), make_questions(count)))
+
+    for question, expected, context, prompt in results:
+        assert context.question == question
+        assert context.verdict == expected, (question, context.verdict)
+        assert context.is_seaqis_context == (expected == SEAQIS), question
+        assert context.fallback_active == (expected == SEAQIS), question
+        if expected == SEAQIS:
+            assert prompt.startswith(SEAQIS_PREFIX) and prompt.endswith(question), prompt
+
+def test_fallback_and_injection_do_not_leak(count=2000, workers=32):
+    validator = QisValidator()
+
+    def check(i):
+        seaqis = i % 2 == 0
+        question = f"Apa itu QIS? {i}" if seaqis else f"Explain photosynthesis {i}"
+        context = RequestContext(question)
+        # Rules and the local classifier only, the model is never asked
+        assert (validator.classify(question, context, use_llm=False) == SEAQIS) == seaqis
+        prompt = inject_context(question, context)
+        assert prompt.startswith(SEAQIS_PREFIX) == seaqis, prompt
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(check, range(count)))
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    test_verdicts_and_prompts_stay_isolated()
+    test_fallback_and_injection_do_not_leak()
+    print(f"Request context stress test passed in {time.perf_counter() - start:.2f}s")
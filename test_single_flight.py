@@ -0,0 +1,134 @@
+"""SingleFlight: concurrent identical questions share one pipeline run
+
+Runs offline: python test_single_flight.py (or pytest test_single_flight.py)
+"""
+from AI_Component.SingleFlight import SingleFlight
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+def test_followers_share_the_leaders_result_and_events(followers=8):
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def run(publish):
+        runs.append(1)
+        publish("search_started", {})
+        started.set()
+        release.wait(5)
+        publish("search_finished", {})
+        return "answer"
+
+    seen = [[] for _ in range(followers)]
+
+    def follow(index):
+        return flight.do("question", run, lambda kind, data: seen[index].append(kind))
+
+    with ThreadPoolExecutor(max_workers=followers + 1) as executor:
+        leader = executor.submit(flight.do, "question", run)
+        assert started.wait(5)
+        waiting = [executor.submit(follow, index) for index in range(followers)]
+        # Every follower has joined the leader's call before it finishes
+        while flight.stats()["coalesced"] < followers:
+            time.sleep(0.001)
+        release.set()
+        assert leader.result() == ("answer", False)
+        assert [future.result() for future in waiting] == [("answer", True)] * followers
+
+    assert len(runs) == 1
+    # Events the followers missed are replayed, the rest arrive live
+    assert all(kinds == ["search_started", "search_finished"] for kinds in seen)
+    assert flight.stats() == {"executed": 1, "coalesced": followers, "in_flight": 0}
+
+def test_events_published_during_the_replay_arrive_in_order(tokens=200):
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    replaying = threading.Event()
+
+    def run(publish):
+        publish("token", 0)
+        started.set()
+        replaying.wait(5)
+        # The leader keeps streaming while the follower is still replaying
+        for index in range(1, tokens):
+            publish("token", index)
+        release.wait(5)
+        return "answer"
+
+    seen = []
+
+    def listener(kind, index):
+        if index == 0:
+            replaying.set()
+            time.sleep(0.05)
+        seen.append(index)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "question", run)
+        assert started.wait(5)
+        follower = executor.submit(flight.do, "question", run, listener)
+        assert replaying.wait(5)
+        release.set()
+        assert leader.result() == ("answer", False)
+        assert follower.result() == ("answer", True)
+
+    assert seen == list(range(tokens))
+
+def test_errors_reach_every_follower():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail(publish):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("crew failed")
+
+    def call():
+        try:
+            flight.do("question", fail)
+        except RuntimeError as error:
+            return str(error)
+        return None
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(call)
+        assert started.wait(5)
+        waiting = [executor.submit(call) for _ in range(3)]
+        while flight.stats()["coalesced"] < 3:
+            time.sleep(0.001)
+        release.set()
+        assert leader.result() == "crew failed"
+        assert [future.result() for future in waiting] == ["crew failed"] * 3
+
+def test_key_is_released_after_a_failure():
+    flight = SingleFlight()
+
+    def fail(publish):
+        raise ValueError("timeout")
+
+    try:
+        flight.do("question", fail)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("the leader's error must propagate")
+    assert flight.stats()["in_flight"] == 0
+    # The next call runs the function again instead of seeing the old error
+    assert flight.do("question", lambda publish: "answer") == ("answer", False)
+    assert flight.stats()["executed"] == 2
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert flight.do(("question", "english"), lambda publish: "en") == ("en", False)
+    assert flight.do(("question", "thai"), lambda publish: "th") == ("th", False)
+    assert flight.stats()["coalesced"] == 0
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    test_followers_share_the_leaders_result_and_events()
+    test_events_published_during_the_replay_arrive_in_order()
+    test_errors_reach_every_follower()
+    test_key_is_released_after_a_failure()
+    test_different_keys_do_not_coalesce()
+    print(f"SingleFlight tests passed in {time.perf_counter() - start:.2f}s")
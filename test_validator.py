@@ -1,4 +1,5 @@
 from AI_Component.validator.validator import QisValidator, qis_validator
+from AI_Component.Context import RequestContext
 
 # Initialize the validator
 validator = QisValidator()
@@ -6,32 +7,35 @@ validator = QisValidator()
 # Note: Make sure you have the required packages installed:
 # pip install langchain-core langchain-openai python-dotenv
 
-# Test cases
-test_cases = [
+# Test cases with the expected verdict (also used to train the local classifier:
+# python -m AI_Component.validator.local_classifier --with-test-cases)
+labelled_cases = [
     # Clearly QIS-related questions
-    "What are the best practices for teaching science in high school?",
-    "How can I improve STEM education in my classroom?",
-    "What is SEAMEO QIS?",
-    "Tell me about quality improvement in science education",
+    ("What are the best practices for teaching science in high school?", "science"),
+    ("How can I improve STEM education in my classroom?", "science"),
+    ("What is SEAMEO QIS?", "seaqis"),
+    ("Tell me about quality improvement in science education", "science"),
     
     # Questions that should be caught by fallback
-    "Apa program SEAQIS?",
-    "Dimana lokasi SEAMEO QIS?",
-    "What is the focus of QIS?",
+    ("Apa program SEAQIS?", "seaqis"),
+    ("Dimana lokasi SEAMEO QIS?", "seaqis"),
+    ("What is the focus of QIS?", "seaqis"),
     
     # Non-QIS questions
-    "What is the weather like today?",
-    "How do I cook pasta?",
-    "Tell me about the latest smartphone"
+    ("What is the weather like today?", "reject"),
+    ("How do I cook pasta?", "reject"),
+    ("Tell me about the latest smartphone", "reject")
 ]
+test_cases = [question for question, _ in labelled_cases]
 
 # Test the class-based validator
 print("Testing QisValidator class:")
 for i, question in enumerate(test_cases):
-    result = validator.validate(question)
+    context = RequestContext(question)
+    result = validator.validate(question, context)
     print(f"{i+1}. '{question}' -> {'QIS-related' if result else 'Not QIS-related'}")
     if result:
-        print(f"   Fallback active: {validator.fallback_active}")
+        print(f"   Fallback active: {context.fallback_active} ({context.matched_rule})")
     print()
 
 # Reset the validator state
@@ -42,4 +46,7 @@ print("\nTesting legacy qis_validator function:")
 for i, question in enumerate(test_cases):
     result = qis_validator(question)
     print(f"{i+1}. '{question}' -> {'QIS-related' if result else 'Not QIS-related'}")
-    print()
\ No newline at end of file
+    print()
+# How often the local classifier escalated to the LLM
+if validator.local_classifier is not None:
+    print("\nLocal classifier stats:", validator.local_classifier.stats())